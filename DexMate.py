@@ -20,29 +20,53 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
+import os
+import sys
+# Headless runs (servers, containers, systemd services) and replay benchmarks never load Tk
+HEADLESS = "--headless" in sys.argv or os.environ.get("DEXMATE_HEADLESS") == "1"
+REPLAY = any(arg == "--replay" or arg.startswith("--replay=") for arg in sys.argv[1:])
+if not (HEADLESS or REPLAY):
+    import tkinter as tk
+    from tkinter import messagebox, ttk, simpledialog
 import json
+import copy
 import datetime
+import enum
 import logging
 from pydexcom import Dexcom
+try:
+    from pydexcom.errors import SessionError
+except ImportError:  # Older pydexcom releases have no errors module
+    class SessionError(Exception):
+        pass
 from notifypy import Notify
+try:
+    import socketio  # Optional: real-time Nightscout updates
+except ImportError:
+    socketio = None
 from cryptography.fernet import Fernet
-import os
 import stat
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
+import re
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import time
 import random
 import base64
+import bisect
+import csv
+import argparse
 import tempfile
 import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import urllib.parse
+import queue
 import webbrowser
 import packaging.version  # For version comparison
+import signal
 import subprocess
-import sys
 import shutil
 import platform
 import ctypes
@@ -138,312 +162,1500 @@ VERSION = "2.0.0"
 # GitHub API URL for checking latest release
 UPDATE_CHECK_URL = "https://api.github.com/repos/rpimaster/DexMate/releases/latest"
 
-class GlucoseWidget:
-    # Define helper methods first
-    @staticmethod
-    def get_file_path(filename):
-        """Get full path for a file in application support directory"""
-        return os.path.join(app_support_dir, filename)
+class AcquisitionWorker:
+    """Bounded pool of background threads that performs all data-source network I/O.
+
+    Jobs are submitted from the Tk thread. Finished results are put on
+    ``results`` as ``(key, result, error)`` tuples, which the UI drains with
+    ``after()`` so it never blocks on Dexcom or Nightscout. A job is not
+    queued twice while one with the same key is still pending.
+    """
+
+    def __init__(self, threads=1):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self.run, name=f"DexMateAcquisition-{i}", daemon=True)
+            for i in range(threads)
+        ]
 
-    def get_icon_path(self):
-        """Get path to application icon, copy if needed."""
-        # Use the global app_support_dir that's now defined
-        icon_path = os.path.join(app_support_dir, "logo_png.png")
-        
-        # Only attempt to copy if the icon doesn't exist
-        if not os.path.exists(icon_path):
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, func, *args):
+        """Queue func(*args) unless a job with the same key is still pending."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self.jobs.put((key, func, args))
+        return True
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            key, func, args = job
+            result, error = None, None
             try:
-                # Determine base path for resources
-                if getattr(sys, 'frozen', False):  # Running as a PyInstaller bundle
-                    base_path = sys._MEIPASS
-                else:  # Running as a script
-                    base_path = os.path.dirname(os.path.abspath(__file__))
-                
-                source_icon = os.path.join(base_path, "logo_png.png")
-                
-                if os.path.exists(source_icon):
-                    shutil.copy(source_icon, icon_path)
-                    logging.info(f"Copied application icon to {icon_path}")
-                else:
-                    logging.warning(f"Source icon not found at {source_icon}")
+                result = func(*args)
             except Exception as e:
-                logging.error(f"Error copying icon: {e}")
-        
-        return icon_path
-
-    def __init__(self, root):
-        """Initialize the application."""
+                error = e
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+            self.results.put((key, result, error))
+
+    def stop(self):
+        """Ask the worker threads to exit once their current jobs finish."""
+        for _ in self._threads:
+            self.jobs.put(None)
+
+class PollScheduler:
+    """Decide when to poll next based on the 5-minute CGM reading cadence.
+
+    Between readings there is nothing new to fetch, so the next poll is
+    scheduled for when the following reading is due. Around the due time the
+    scheduler polls quickly; once a reading is late it backs off
+    exponentially with jitter.
+    """
+
+    READING_INTERVAL = 300  # Seconds between CGM readings
+    FAST_POLL_WINDOW = 90  # Seconds after the due time to poll quickly
+    FAST_POLL_INTERVAL = 10  # Seconds between polls inside the fast window
+    MAX_BACKOFF = 300  # Upper bound for late-reading backoff in seconds
+
+    def __init__(self):
+        self.last_reading_time = None  # Naive datetime of the newest reading
+        self.missed_polls = 0  # Polls without a new reading after the fast window
+
+    def reset(self):
+        self.last_reading_time = None
+        self.missed_polls = 0
+
+    def record_reading(self, reading_time, now=None):
+        """Record the outcome of a poll that returned reading_time (or None)."""
+        if reading_time is not None and (self.last_reading_time is None or reading_time > self.last_reading_time):
+            self.last_reading_time = reading_time
+            self.missed_polls = 0
+        elif self.seconds_overdue(now) > self.FAST_POLL_WINDOW:
+            self.missed_polls += 1
+
+    def record_failure(self):
+        """Record a poll that failed outright."""
+        self.missed_polls += 1
+
+    def seconds_overdue(self, now=None):
+        """Seconds since the next reading was due (negative while not yet due)."""
+        if self.last_reading_time is None:
+            return float("inf")
+        now = now or datetime.datetime.now()
+        due = self.last_reading_time + datetime.timedelta(seconds=self.READING_INTERVAL)
+        return (now - due).total_seconds()
+
+    def next_delay(self, now=None):
+        """Return the number of seconds to wait before the next poll."""
+        overdue = self.seconds_overdue(now)
+        if overdue < 0:
+            # Sleep until the next reading is due
+            return -overdue
+        if overdue <= self.FAST_POLL_WINDOW and not self.missed_polls:
+            return self.FAST_POLL_INTERVAL
+
+        # Reading is late (or we have none yet): jittered exponential backoff
+        backoff = min(self.MAX_BACKOFF, self.FAST_POLL_INTERVAL * 2 ** min(self.missed_polls, 8))
+        return random.uniform(backoff / 2, backoff)
+
+class PollController:
+    """Own the single Tk timer that drives glucose polling.
+
+    Every start, stop and reschedule goes through this object, which cancels
+    any pending after() id before creating a new one. Reconfiguring the data
+    source therefore restarts the one poll loop instead of adding another.
+    """
+
+    def __init__(self, root, poll, next_delay):
         self.root = root
-        
-        # Initialize attributes
-        self.opacity = 0.8  # Default opacity value
-        # ... other attributes ...
+        self._poll = poll  # Called on each tick
+        self._next_delay = next_delay  # Returns seconds until the next tick
+        self._after_id = None
+        self.running = False
+
+    @property
+    def active_loops(self):
+        """Number of live poll timers (0 or 1)."""
+        return 0 if self._after_id is None else 1
+
+    def start(self, delay=0):
+        """Start polling after delay seconds; a no-op if already running."""
+        if self.running:
+            return
+        self.running = True
+        self._schedule(delay)
+        logging.info(f"Poll loop started ({self.active_loops} active)")
+
+    def stop(self):
+        """Stop polling and cancel the pending timer."""
+        self.running = False
+        self._cancel()
+        logging.info(f"Poll loop stopped ({self.active_loops} active)")
+
+    def restart(self, delay=0):
+        """Stop and start again, polling after delay seconds."""
+        self.stop()
+        self.start(delay)
+
+    def reschedule(self, delay):
+        """Move the pending tick so it fires after delay seconds."""
+        if self.running:
+            self._schedule(delay)
+
+    def _schedule(self, delay):
+        self._cancel()
+        self._after_id = self.root.after(int(delay * 1000), self._tick)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception as e:
+                logging.warning(f"Failed to cancel poll timer: {e}")
+            self._after_id = None
 
-        # Initialize the rest of the class
-        # ... existing code ...
+    def _tick(self):
+        self._after_id = None
+        try:
+            self._poll()
+        except Exception as e:
+            logging.error(f"Poll failed: {e}")
+        finally:
+            if self.running and self._after_id is None:
+                self._schedule(self._next_delay())
+
+def create_http_session(pool_size=4):
+    """Create a requests.Session with pooled keep-alive connections and gzip negotiation."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    return session
+
+class NightscoutClient:
+    """Persistent Nightscout API client.
+
+    One requests.Session is kept for the lifetime of the data source, so
+    polls reuse pooled keep-alive connections and TLS sessions and negotiate
+    gzip. Authentication headers are built once: an API secret is hashed up
+    front, and an access token is exchanged for a JWT that is cached until
+    shortly before it expires.
+
+    Several clients may share one session (caregiver mode); the auth headers
+    are kept per client and sent with each request, and a shared session is
+    left open by close().
+    """
+
+    # Nightscout access tokens look like "<subject>-<16 hex chars>"
+    TOKEN_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_.]*-[0-9a-f]{16}$")
+    JWT_REFRESH_MARGIN = 60  # Refresh the JWT this many seconds before expiry
+
+    def __init__(self, url, api_secret=None, timeout=10, session=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+        self._owns_session = session is None
+        self.session = session or create_http_session()
+        self.auth_headers = {}
+
+        # High-water mark and validators for incremental entry polling
+        self.last_entry_date = None  # Newest entry "date" seen, in epoch milliseconds
+        self._mark_lock = threading.Lock()  # The push listener thread advances the mark too
+        self._etag = None
+        self._last_modified = None
+
+        self._access_token = None
+        self._jwt_expires = 0
+        if api_secret and self.TOKEN_PATTERN.match(api_secret):
+            self._access_token = api_secret
+        elif api_secret:
+            self.auth_headers["api-secret"] = hashlib.sha1(api_secret.encode()).hexdigest()
+
+    def socket_auth(self):
+        """Payload for the socket.io "authorize" event, using the same credentials."""
+        auth = {"client": "web", "history": 1}
+        if self._access_token:
+            auth["token"] = self._access_token
+        elif "api-secret" in self.auth_headers:
+            auth["secret"] = self.auth_headers["api-secret"]
+        return auth
+
+    def _ensure_jwt(self):
+        """Exchange the access token for a JWT unless the cached one is still valid."""
+        if not self._access_token or time.time() < self._jwt_expires - self.JWT_REFRESH_MARGIN:
+            return
 
-        # Initialize attributes early
-        self.data_source = "Dexcom"  # Default data source
-        self.unit = "mmol"  # Default unit (initialize early to avoid AttributeError)
-        self.prediction_enabled = True  # Default value for prediction_enabled
-        self.prediction_history = []  # Initialize prediction history
-        self.max_history = 6  # Use last 6 readings for prediction
+        response = self.session.get(
+            f"{self.url}/api/v2/authorization/request/{self._access_token}",
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        auth = response.json()
+        self.auth_headers["Authorization"] = f"Bearer {auth['token']}"
+        self._jwt_expires = auth.get("exp", time.time() + 3600)
+        logging.info("Obtained Nightscout JWT")
+
+    def get(self, path, params=None, headers=None):
+        """GET path on the Nightscout site, refreshing a rejected JWT once."""
+        self._ensure_jwt()
+        response = self.session.get(
+            f"{self.url}{path}", params=params, headers={**self.auth_headers, **(headers or {})}, timeout=self.timeout
+        )
+        if response.status_code == 401 and self._access_token:
+            self._jwt_expires = 0
+            self._ensure_jwt()
+            response = self.session.get(
+                f"{self.url}{path}", params=params, headers={**self.auth_headers, **(headers or {})}, timeout=self.timeout
+            )
+        response.raise_for_status()
+        return response
 
-        # Initialize file paths using helper methods
-        self.key_file_path = self.get_file_path('secret.key')
-        self.credentials_file_path = self.get_file_path('credentials.json')
-        self.settings_file_path = self.get_file_path('settings.json')
-        self.history_file = self.get_file_path('history.json')
+    def advance_entry_date(self, date):
+        """Move the high-water mark forward to date (ms); False if it was already there or past it."""
+        with self._mark_lock:
+            if self.last_entry_date is not None and date <= self.last_entry_date:
+                return False
+            self.last_entry_date = date
+            return True
 
-        # Set DexMate logo path
-        self.dexmate_icon_path = self.get_icon_path()
+    def fetch_new_entries(self, count=1):
+        """Return SGV entries newer than the high-water mark, or None if nothing changed.
+
+        Only entries after the newest date already seen are requested, and
+        the ETag / Last-Modified validators from the previous response are
+        sent back. A 304 or an empty result returns None before any JSON is
+        parsed.
+        """
+        params = {"count": count}
+        with self._mark_lock:
+            last_entry_date = self.last_entry_date
+        if last_entry_date is not None:
+            params["find[date][$gt]"] = last_entry_date
+
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        response = self.get("/api/v1/entries.json", params=params, headers=headers)
+        if response.status_code == 304 or response.content.strip() in (b"", b"[]"):
+            return None
 
-        # Set DexMate logo as window icon
-        if self.dexmate_icon_path and os.path.exists(self.dexmate_icon_path):
-            try:
-                # Windows needs special handling for .ico files
-                if platform.system() == "Windows":
-                    # Convert PNG to ICO in temp directory
-                    ico_path = self.convert_png_to_ico(self.dexmate_icon_path)
-                    if ico_path:
-                        self.root.iconbitmap(ico_path)
-                        logging.info("Windows icon set using ICO")
-                    else:
-                        # Fallback to PNG if conversion fails
-                        self.icon_img = tk.PhotoImage(file=self.dexmate_icon_path)
-                        self.root.iconphoto(True, self.icon_img)
-                        logging.info("Windows icon set using PNG fallback")
-                else:
-                    # Non-Windows platforms can use PNG directly
-                    self.icon_img = tk.PhotoImage(file=self.dexmate_icon_path)
-                    self.root.iconphoto(True, self.icon_img)
-                    logging.info("Main window icon set successfully")
-            except Exception as e:
-                logging.error(f"Error setting window icon: {e}")
-        else:
-            logging.warning("DexMate icon not available")
+        entries = response.json()
+        if not entries:
+            return None
 
-        self.login_window = None  # Initialize login_window as None
-        self.login_window_created = False  # Track whether the login window has been created
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        self.advance_entry_date(max(entry["date"] for entry in entries))
+        return entries
+
+    def fetch_entries_between(self, start_ms, end_ms, count):
+        """Return up to count entries with start_ms <= date <= end_ms in one request.
+
+        Used for backfill and gap catch-up, so the polling high-water mark
+        and validators are left untouched.
+        """
+        params = {"count": count, "find[date][$gte]": start_ms, "find[date][$lte]": end_ms}
+        response = self.get("/api/v1/entries.json", params=params)
+        return response.json() or []
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+class Trend(enum.IntEnum):
+    """CGM trend, numbered like the Dexcom Share API."""
+    NONE = 0
+    DOUBLE_UP = 1
+    SINGLE_UP = 2
+    FORTY_FIVE_UP = 3
+    FLAT = 4
+    FORTY_FIVE_DOWN = 5
+    SINGLE_DOWN = 6
+    DOUBLE_DOWN = 7
+    NOT_COMPUTABLE = 8
+    RATE_OUT_OF_RANGE = 9
+
+TREND_DESCRIPTIONS = {
+    Trend.NONE: "unable to determine trend",
+    Trend.DOUBLE_UP: "rising quickly",
+    Trend.SINGLE_UP: "rising",
+    Trend.FORTY_FIVE_UP: "rising slightly",
+    Trend.FLAT: "steady",
+    Trend.FORTY_FIVE_DOWN: "falling slightly",
+    Trend.SINGLE_DOWN: "falling",
+    Trend.DOUBLE_DOWN: "falling quickly",
+    Trend.NOT_COMPUTABLE: "unable to determine trend",
+    Trend.RATE_OUT_OF_RANGE: "unable to determine trend",
+}
+
+# Nightscout "direction" strings
+NIGHTSCOUT_DIRECTIONS = {
+    "NONE": Trend.NONE,
+    "DoubleUp": Trend.DOUBLE_UP,
+    "SingleUp": Trend.SINGLE_UP,
+    "FortyFiveUp": Trend.FORTY_FIVE_UP,
+    "Flat": Trend.FLAT,
+    "FortyFiveDown": Trend.FORTY_FIVE_DOWN,
+    "SingleDown": Trend.SINGLE_DOWN,
+    "DoubleDown": Trend.DOUBLE_DOWN,
+    "NOT COMPUTABLE": Trend.NOT_COMPUTABLE,
+    "RATE OUT OF RANGE": Trend.RATE_OUT_OF_RANGE,
+}
+NIGHTSCOUT_DIRECTION_NAMES = {trend: name for name, trend in NIGHTSCOUT_DIRECTIONS.items()}
+
+class Reading:
+    """A single glucose reading shared by all data-source drivers."""
+    __slots__ = ("mg_dl", "timestamp", "trend")
+
+    def __init__(self, mg_dl, timestamp, trend=Trend.NONE):
+        self.mg_dl = int(mg_dl)  # Glucose in mg/dL
+        self.timestamp = int(timestamp)  # Epoch seconds
+        self.trend = trend
+
+    @property
+    def datetime(self):
+        """Naive local datetime of the reading."""
+        return datetime.datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def trend_description(self):
+        return TREND_DESCRIPTIONS.get(self.trend, "unable to determine trend")
+
+    def to_nightscout(self):
+        """The reading as a Nightscout SGV entry."""
+        return {
+            "_id": f"dexmate-{self.timestamp}",
+            "type": "sgv",
+            "sgv": self.mg_dl,
+            "date": self.timestamp * 1000,
+            "dateString": datetime.datetime.fromtimestamp(self.timestamp, datetime.timezone.utc)
+                          .isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "trend": int(self.trend),
+            "direction": NIGHTSCOUT_DIRECTION_NAMES.get(self.trend, "NOT COMPUTABLE"),
+            "device": "DexMate",
+        }
 
-        self.root.title("DexMate")
-        self.root.geometry("300x270")  # Increased height for prediction label
+    def __repr__(self):
+        return f"Reading({self.mg_dl}, {self.timestamp}, {self.trend.name})"
+
+class CircuitBreaker:
+    """Circuit breaker guarding calls to one data-source driver.
+
+    After failure_threshold consecutive failures the circuit opens and polls
+    are skipped for an exponentially growing, jittered delay. When the delay
+    has passed a single trial poll is allowed (half-open); success closes
+    the circuit and failure opens it again for longer.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=3, base_delay=30, max_delay=900):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0  # Consecutive failures
+        self.trips = 0  # Times opened since the last success
+        self.retry_at = 0  # time.monotonic() at which a trial poll is allowed
+
+    def allow(self):
+        """Return True if a request may be made now."""
+        if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+            self.state = self.HALF_OPEN
+            logging.info("Circuit half-open, allowing a trial request")
+        return self.state != self.OPEN
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logging.info("Circuit closed, data source recovered")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            delay = min(self.max_delay, self.base_delay * 2 ** self.trips)
+            delay = random.uniform(delay / 2, delay)
+            self.trips += 1
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + delay
+            logging.warning(f"Circuit open after {self.failures} failures, retrying in {delay:.0f}s")
+
+    def seconds_until_retry(self):
+        if self.state != self.OPEN:
+            return 0
+        return max(0, self.retry_at - time.monotonic())
+
+    def describe(self):
+        """Short status text for the widget, or "" while the circuit is closed."""
+        if self.state == self.OPEN:
+            return f"Offline - retrying in {int(self.seconds_until_retry())}s"
+        if self.state == self.HALF_OPEN:
+            return "Reconnecting..."
+        return ""
+
+class DataSourceDriver:
+    """Interface implemented by every glucose data source.
+
+    Drivers are only called from the acquisition worker, one job at a time
+    under the driver's lock, and return Reading objects, so the UI never
+    needs to know which source is in use.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        # Held for each worker job: a client's ETag, JWT and session renewal are not thread-safe
+        self.lock = threading.Lock()
+
+    def fetch_latest(self):
+        """Return the newest Reading, or None if there is nothing new."""
+        raise NotImplementedError
+
+    def fetch_range(self, start, end, max_count):
+        """Return up to max_count Readings with start <= timestamp <= end, oldest first.
+
+        start and end are epoch seconds.
+        """
+        raise NotImplementedError
+
+    def session_state(self):
+        """Return a dict describing a reusable login session, or None."""
+        return None
 
-        # Add prediction history before any updates
-        logging.info(f"Max history initialized: {self.max_history}")
+    def close(self):
+        """Release sessions and other resources held by the driver."""
 
-        self.label = tk.Label(root, text="Glucose Level:")
-        self.label.pack(pady=5)
+class RestoredDexcom(Dexcom):
+    """Dexcom client rebuilt from a saved account and session id.
 
-        self.glucose_value = tk.StringVar()
-        self.glucose_label = tk.Label(root, textvariable=self.glucose_value, font=("Helvetica", 22))
-        self.glucose_label.pack()
+    pydexcom logs in from its constructor; while restoring, that step is
+    skipped and the saved ids are installed instead. If the server later
+    rejects the session, pydexcom's own renewal runs a normal login.
+    """
 
-        self.trend_label = tk.Label(root, text="", font=("Helvetica", 22))
-        self.trend_label.pack(pady=5)
+    def __init__(self, account_id, session_id, **kwargs):
+        self._restoring = True
+        try:
+            super().__init__(**kwargs)
+        finally:
+            self._restoring = False
+        # pydexcom >= 0.4 keeps the ids private, older releases public
+        for attr, value in (("account_id", account_id), ("session_id", session_id)):
+            setattr(self, f"_{attr}" if hasattr(self, f"_{attr}") else attr, value)
+
+    def _get_session(self):
+        if not self._restoring:
+            return super()._get_session()
+
+    def create_session(self):
+        if not self._restoring:
+            return super().create_session()
+
+class DexcomDriver(DataSourceDriver):
+    """Dexcom Share data source backed by a pydexcom session."""
+
+    name = "Dexcom"
+
+    def __init__(self, dexcom, username=None, password=None, region=None):
+        super().__init__()
+        self.dexcom = dexcom
+        # Kept so an expired Share session can be re-established
+        self._username = username
+        self._password = password
+        self._region = region
+
+    @classmethod
+    def login(cls, username, password, region):
+        return cls(Dexcom(username=username, password=password, region=region), username, password, region)
+
+    @classmethod
+    def restore(cls, username, password, region, account_id, session_id):
+        """Reuse a saved Share session, falling back to a full login if it cannot be rebuilt."""
+        try:
+            dexcom = RestoredDexcom(account_id, session_id, username=username, password=password, region=region)
+            logging.info("Reusing saved Dexcom session")
+            return cls(dexcom, username, password, region)
+        except Exception as e:
+            logging.warning(f"Could not restore Dexcom session, logging in: {e}")
+            return cls.login(username, password, region)
+
+    def session_state(self):
+        """Return the account and session ids of the current Share session."""
+        state = {}
+        for attr in ("account_id", "session_id"):
+            value = getattr(self.dexcom, f"_{attr}", getattr(self.dexcom, attr, None))
+            if value is None:
+                return None
+            state[attr] = str(value)
+        return state
+
+    def relogin(self):
+        """Replace an expired Share session with a fresh login."""
+        if not (self._username and self._password):
+            raise SessionError("Dexcom session expired and no credentials to renew it")
+        logging.info("Dexcom session expired, logging in again")
+        self.dexcom = Dexcom(username=self._username, password=self._password, region=self._region)
+
+    def _call(self, func, *args, **kwargs):
+        """Call a pydexcom method, logging in again once if the session has expired."""
+        try:
+            return func(self.dexcom)(*args, **kwargs)
+        except SessionError:
+            self.relogin()
+            return func(self.dexcom)(*args, **kwargs)
 
-        self.time_label = tk.Label(root, text="", font=("Helvetica", 12))
-        self.time_label.pack(pady=5)
+    @staticmethod
+    def to_reading(bg):
+        return Reading(bg.value, bg.datetime.timestamp(), Trend(bg.trend))
+
+    def fetch_latest(self):
+        bg = self._call(lambda d: d.get_current_glucose_reading)
+        return self.to_reading(bg) if bg is not None else None
+
+    def fetch_range(self, start, end, max_count):
+        # Share only supports "the last N minutes", so reach back to start
+        minutes = min(1440, int((time.time() - start) // 60) + 1)
+        readings = [
+            self.to_reading(bg)
+            for bg in self._call(lambda d: d.get_glucose_readings, minutes=minutes, max_count=min(max_count, 288)) or []
+        ]
+        return sorted((r for r in readings if start <= r.timestamp <= end), key=lambda r: r.timestamp)
 
-        self.delta_label = tk.Label(root, text="", font=("Helvetica", 12))
-        self.delta_label.pack(pady=5)
+    def close(self):
+        # Try to properly log out if possible
+        if hasattr(self.dexcom, 'logout'):
+            self.dexcom.logout()
+        self.dexcom = None
+        self._username = self._password = None
 
-        # Add prediction label with delta and trend
-        self.prediction_label = tk.Label(root, text="Prediction: --", font=("Helvetica", 12))
-        self.prediction_label.pack(pady=5)
+class NightscoutDriver(DataSourceDriver):
+    """Nightscout data source backed by a persistent NightscoutClient."""
 
-        # Default target range in mmol
-        self.target_range = (3.9, 12.0)
-        self.last_reading_time = None  # Initialize last reading time to NONE
-        self.dexcom = None  # Initialize dexcom object to None
-        self.previous_glucose = None
-        self.notifications_snoozed_until = None  # To track the snooze status
-        self.connection_retries = 0  # Track connection retries
-        self.max_retries = 5  # Max connection retries before giving up
-        self.last_successful_update = None  # Track last successful update time
+    name = "Nightscout"
 
-        self.locations = [self.set_top_left, self.set_bottom_left, self.set_bottom_right, self.set_top_right]
-        self.current_location = 0
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
 
-        # Create a frame for the buttons
-        self.button_frame = tk.Frame(root)
-        self.button_frame.pack(pady=5)  # Add padding around the frame
+    @staticmethod
+    def to_reading(entry):
+        # REST entries carry sgv/date, socket.io dataUpdate SGVs carry mgdl/mills
+        mg_dl = entry.get("sgv", entry.get("mgdl"))
+        date = entry.get("date", entry.get("mills"))
+        direction = entry.get("direction", "NOT COMPUTABLE")
+        return Reading(mg_dl, date // 1000, NIGHTSCOUT_DIRECTIONS.get(direction, Trend.NOT_COMPUTABLE))
+
+    def fetch_latest(self):
+        # Only entries newer than the last one seen; None means no change
+        entries = self.client.fetch_new_entries()
+        if not entries:
+            return None
+        return self.to_reading(entries[0])
+
+    def fetch_range(self, start, end, max_count):
+        entries = self.client.fetch_entries_between(start * 1000, end * 1000, max_count)
+        readings = [self.to_reading(e) for e in entries if e.get("sgv") is not None]
+        return sorted(readings, key=lambda r: r.timestamp)
+
+    def close(self):
+        self.client.close()
+
+class NightscoutPushListener:
+    """Receives new Nightscout SGVs over the site's socket.io data channel.
+
+    Nightscout broadcasts "dataUpdate" to authorized clients as soon as an
+    entry is uploaded. New readings and connection changes are put on the
+    acquisition results queue as ("push", (driver, reading), None) and
+    ("push_state", (driver, connected), None), so the Tk thread applies
+    them like any other result. While the socket is down the widget falls
+    back to polling. Requires the optional python-socketio package.
+    """
+
+    RETRY_DELAY = 5  # Seconds before the first reconnect attempt
+    MAX_RETRY_DELAY = 300
+
+    def __init__(self, driver, results):
+        self.driver = driver
+        self.results = results
+        self.connected = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.sio = socketio.Client(
+            reconnection=True, reconnection_delay=self.RETRY_DELAY,
+            reconnection_delay_max=self.MAX_RETRY_DELAY, logger=False
+        )
+        self.sio.on("connect", self._on_connect)
+        self.sio.on("disconnect", self._on_disconnect)
+        self.sio.on("dataUpdate", self._on_data_update)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="NightscoutPush")
+        self._thread.start()
+
+    def _run(self):
+        # The initial connect is not retried by python-socketio, so retry it here
+        delay = self.RETRY_DELAY
+        while not self._stopped.is_set():
+            try:
+                self.sio.connect(self.driver.client.url, transports=["websocket", "polling"], wait_timeout=10)
+                delay = self.RETRY_DELAY
+                self.sio.wait()  # Returns once disconnected for good
+            except Exception as e:
+                logging.warning(f"Nightscout push connection failed: {e}")
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
 
-        # Create a button for changing widget location
-        self.location_button = tk.Button(self.button_frame, text="Change Location", command=self.change_location)
-        self.location_button.pack(side="left", padx=10)  # Pack left with some padding
+    def _on_connect(self):
+        self.sio.emit("authorize", self.driver.client.socket_auth(), callback=self._on_authorized)
 
-        # Create a settings button
-        self.settings_button = tk.Button(self.button_frame, text="Settings", command=self.open_settings)
-        self.settings_button.pack(side="left", padx=10)  # Pack left with some padding
+    def _on_authorized(self, data=None):
+        if isinstance(data, dict) and not data.get("read", True):
+            logging.error("Nightscout push authorization was refused, staying on polling")
+            self.sio.disconnect()
+            return
+        logging.info("Nightscout push connected")
+        self.connected = True
+        self.results.put(("push_state", (self.driver, True), None))
+
+    def _on_disconnect(self, *args):
+        if self.connected:
+            logging.warning("Nightscout push disconnected, falling back to polling")
+        self.connected = False
+        self.results.put(("push_state", (self.driver, False), None))
+
+    def _on_data_update(self, data):
+        sgvs = [sgv for sgv in (data or {}).get("sgvs", []) if sgv.get("mgdl") and sgv.get("mills")]
+        if not sgvs:
+            return
+        newest = max(sgvs, key=lambda sgv: sgv["mills"])
+        # Advance the poll high-water mark so the fallback poll does not refetch it
+        if not self.driver.client.advance_entry_date(newest["mills"]):
+            return
+        self.results.put(("push", (self.driver, self.driver.to_reading(newest)), None))
 
-        # Load saved settings
-        self.load_settings()
+    def stop(self):
+        self._stopped.set()
+        try:
+            self.sio.disconnect()
+        except Exception as e:
+            logging.warning(f"Error closing Nightscout push connection: {e}")
 
-        # Load the last saved position with fallbacks
-        self.load_last_position()
+class FollowedAccount:
+    """An additional monitored account shown as a compact row in caregiver mode.
 
-        # Always load prediction history
-        self.prediction_history = self.load_history() or []
-        logging.info(f"Loaded prediction history: {len(self.prediction_history)} entries")
-        
-        # Only show prediction UI if enabled
-        if self.prediction_enabled:
-            self.prediction_label.pack(pady=5)
-        else:
-            self.prediction_label.pack_forget()
+    Followed accounts share the widget's acquisition pool and poll loop, and
+    Nightscout ones its HTTP session; each keeps its own driver, cadence and
+    last reading. A failed login is retried on the account's own breaker.
+    """
 
-        # Check if credentials are already saved, if not, show the login window
-        self.check_saved_credentials()
+    def __init__(self, name, data_source, region="us"):
+        self.name = name
+        self.data_source = data_source
+        self.region = region
+        self.driver = None
+        self.breaker = CircuitBreaker()  # Backs off login retries until a driver exists
+        self.needs_login = False  # Set when the login failed and should be retried
+        self.poll_scheduler = PollScheduler()
+        self.next_poll_at = 0  # time.monotonic() of the next poll or login retry
+        self.last_reading = None
+        self.status = "Connecting..."
+        # Row widgets, created by GlucoseWidget.create_account_row
+        self.row = None
+        self.value_label = None
+        self.time_label = None
+
+    def next_poll_delay(self):
+        """Seconds until this account should be polled (or its login retried) again."""
+        delay = self.poll_scheduler.next_delay()
+        breaker = self.driver.breaker if self.driver else self.breaker
+        return max(delay, breaker.seconds_until_retry(), 1)
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.close()
+            except Exception as e:
+                logging.warning(f"Error closing driver for {self.name}: {e}")
+            self.driver = None
 
-        # Variable to track the pin state
-        self.is_pinned = False
+class ReplayDriver(DataSourceDriver):
+    """Data source that replays a recorded JSON or CSV trace.
 
-        # Bind the window close event to save the position
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    JSON traces are a list of Nightscout entries ({"sgv", "date" in ms,
+    "direction"}) or of {"timestamp", "mg_dl", "trend"} objects. CSV traces
+    need a header with timestamp/date and mg_dl/sgv/value columns and an
+    optional trend/direction column. Timestamps may be epoch seconds,
+    epoch milliseconds or ISO strings.
 
-        # Initial update of labels
-        self.update_labels()
-        self.schedule_update()  # Schedule periodic updates
-        
-        # Check for updates in the background
-        self.check_for_updates()
+    speed scales the gaps between readings (60 plays an hour per minute);
+    0 replays as fast as possible.
+    """
 
-        # Obfuscate sensitive strings in memory
-        self.OBFUSCATOR = os.urandom(16)
-    
-        # Register cleanup for secure memory wipe
-        import atexit
-        atexit.register(self.secure_cleanup)
+    name = "Replay"
 
-        # Verify directory permissions at startup
-        if not self.verify_directory_permissions():
-            messagebox.showwarning(
-                "Permission Issue",
-                f"Couldn't write to data directory:\n{app_support_dir}\n"
-                "Some features may not work properly."
-            )
+    def __init__(self, trace_path, speed=0):
+        super().__init__()
+        self.trace_path = trace_path
+        self.speed = speed
+        self.readings = self.load_trace(trace_path)
+        self._timestamps = [r.timestamp for r in self.readings]
+        self._position = 0
 
-    def convert_target_range(self, min_val, max_val, from_unit, to_unit):
-        """Convert target range between units"""
-        if from_unit == to_unit:
-            return min_val, max_val
-            
-        if from_unit == "mmol" and to_unit == "mgdl":
-            return min_val * 18.0, max_val * 18.0
-        elif from_unit == "mgdl" and to_unit == "mmol":
-            return min_val / 18.0, max_val / 18.0
-        return min_val, max_val
+    @property
+    def exhausted(self):
+        return self._position >= len(self.readings)
 
-    def convert_png_to_ico(self, png_path):
-        """Convert PNG to ICO format for Windows icons."""
+    @staticmethod
+    def parse_timestamp(value):
+        """Convert epoch seconds, epoch milliseconds or an ISO string to epoch seconds."""
         try:
-            # Save the .ico file in the application support directory
-            ico_path = os.path.join(app_support_dir, "dexmate.ico")
+            number = float(value)
+        except (TypeError, ValueError):
+            return int(datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+        return int(number / 1000) if number > 1e11 else int(number)
 
-            # Open PNG and convert to ICO
-            img = Image.open(png_path)
-            img.save(ico_path, format='ICO')
+    @staticmethod
+    def parse_trend(value):
+        if value in (None, ""):
+            return Trend.NONE
+        if str(value).isdigit():
+            return Trend(int(value))
+        if value in NIGHTSCOUT_DIRECTIONS:
+            return NIGHTSCOUT_DIRECTIONS[value]
+        return Trend.__members__.get(str(value).upper(), Trend.NOT_COMPUTABLE)
+
+    @classmethod
+    def load_trace(cls, trace_path):
+        """Load a trace file into a list of Readings sorted by timestamp."""
+        readings = []
+        if trace_path.lower().endswith(".csv"):
+            with open(trace_path, newline='') as f:
+                rows = list(csv.DictReader(f))
+        else:
+            with open(trace_path, 'r') as f:
+                rows = json.load(f)
+
+        for row in rows:
+            if isinstance(row, (list, tuple)):  # history.json style [time, mg/dL] pairs
+                row = {"timestamp": row[0], "mg_dl": row[1]}
+            timestamp = row.get("timestamp", row.get("date"))
+            mg_dl = row.get("mg_dl", row.get("sgv", row.get("value")))
+            if timestamp in (None, "") or mg_dl in (None, ""):
+                continue
+            trend = cls.parse_trend(row.get("trend", row.get("direction")))
+            readings.append(Reading(float(mg_dl), cls.parse_timestamp(timestamp), trend))
 
-            logging.info(f"Converted PNG to ICO: {ico_path}")
-            return ico_path
-        except ImportError:
-            logging.warning("Pillow not installed, cannot convert PNG to ICO")
-        except Exception as e:
-            logging.error(f"Error converting PNG to ICO: {e}")
-        return None
+        readings.sort(key=lambda r: r.timestamp)
+        logging.info(f"Loaded {len(readings)} readings from trace {trace_path}")
+        return readings
 
-    def convert_png_to_temp_bmp(self, png_path):
-        """Convert PNG to temporary BMP for Windows notifications."""
-        try:
-            if not png_path or not os.path.exists(png_path):
-                return None
-                
-            # Create temp BMP file in application support directory
-            bmp_path = os.path.join(app_support_dir, "temp_notify_icon.bmp")
-            
-            # Open PNG and convert to BMP
-            img = Image.open(png_path)
-            img.save(bmp_path, format='BMP')
-            
-            logging.info(f"Converted PNG to BMP: {bmp_path}")
-            return bmp_path
-        except Exception as e:
-            logging.error(f"PNG to BMP conversion failed: {e}")
+    def fetch_latest(self):
+        if self.exhausted:
             return None
+        reading = self.readings[self._position]
+        if self.speed and self._position > 0:
+            time.sleep((reading.timestamp - self.readings[self._position - 1].timestamp) / self.speed)
+        self._position += 1
+        return reading
 
-    def toggle_pin_on_top(self):
-        self.is_pinned = not self.is_pinned
-        self.root.wm_attributes("-topmost", self.is_pinned)
-        self.pin_on_top_button.config(text="Unpin" if self.is_pinned else "Pin on Top")
+    def fetch_range(self, start, end, max_count):
+        lo = bisect.bisect_left(self._timestamps, start)
+        hi = bisect.bisect_right(self._timestamps, end)
+        return self.readings[max(lo, hi - max_count):hi]
 
-    def check_saved_credentials(self):
-        """Check saved credentials and authenticate if available."""
-        config = self.load_config()
-        if config:
-            self.data_source = config.get("data_source", "")
-            self.region = config.get("region", "us")
-            self.unit = config.get("unit", "mmol")
-            # ... (rest of existing code) ...
-        else:
-            self.data_source = ""  # Ensure it's empty if no config
-    
-        # Show login window if no data source is set
-        if not self.data_source:
-            self.show_login_window()
+class PipelineStats:
+    """Collect per-stage latencies for the reading pipeline."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def wrap(self, name, func):
+        """Return func wrapped so each call's duration is recorded under name."""
+        samples = self.samples.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def report(self, readings, elapsed):
+        """Return a text report of throughput and per-stage latency."""
+        return "\n".join([
+            f"Replayed {readings} readings in {elapsed:.2f}s "
+            f"({readings / elapsed if elapsed else 0:.1f} readings/s)",
+            self.table(),
+        ])
+
+    def table(self):
+        """Return the per-stage latency table."""
+        lines = [f"{'stage':<28}{'calls':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            p50 = ordered[len(ordered) // 2]
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            lines.append(
+                f"{name:<28}{len(samples):>8}{sum(samples) / len(samples) * 1000:>10.3f}"
+                f"{p50 * 1000:>10.3f}{p95 * 1000:>10.3f}{ordered[-1] * 1000:>10.3f}"
+            )
+        return "\n".join(lines)
+
+class ReadingStore:
+    """Time-ordered in-memory readings, shared with the local API threads."""
+
+    def __init__(self, max_age=86400):
+        self.max_age = max_age  # Seconds of readings kept behind the newest one
+        self._times = []  # Epoch seconds, ascending
+        self._readings = []
+        self._lock = threading.Lock()
+
+    def add(self, readings):
+        """Insert Readings not already held; returns how many were new."""
+        added = 0
+        with self._lock:
+            for reading in readings:
+                i = bisect.bisect_left(self._times, reading.timestamp)
+                if i < len(self._times) and self._times[i] == reading.timestamp:
+                    continue
+                self._times.insert(i, reading.timestamp)
+                self._readings.insert(i, reading)
+                added += 1
+            if self._times:
+                drop = bisect.bisect_left(self._times, self._times[-1] - self.max_age)
+                del self._times[:drop]
+                del self._readings[:drop]
+        return added
+
+    def query(self, count, start=None, end=None):
+        """Return up to count readings with start <= timestamp <= end, newest first."""
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self._times, start)
+            hi = len(self._times) if end is None else bisect.bisect_right(self._times, end)
+            return self._readings[max(lo, hi - count):hi][::-1]
+
+class LocalApiHandler(BaseHTTPRequestHandler):
+    """Serves the Nightscout entries API from a ReadingStore.
+
+    Supports /api/v1/entries[.json], /api/v1/entries/sgv[.json] and
+    /api/v1/entries/current[.json] with count and find[date][$gt|$gte|$lt|$lte],
+    plus /api/v1/status.json. Paths without .json return Nightscout's
+    tab-separated text format.
+    """
+
+    server_version = f"DexMate/{VERSION}"
+    ENTRY_PATHS = ("/api/v1/entries", "/api/v1/entries/sgv")
+    CURRENT_PATH = "/api/v1/entries/current"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        as_json = url.path.endswith(".json")
+        path = url.path[:-len(".json")] if as_json else url.path.rstrip("/")
+
+        if path == "/api/v1/status":
+            self.send_body(json.dumps({"status": "ok", "name": "DexMate", "version": VERSION, "apiEnabled": True}),
+                           "application/json")
             return
-        
-        # Get credentials from ENCRYPTED storage
-        all_credentials = self.get_saved_credentials()
-        
-        if self.data_source == "Dexcom":
-            credentials = all_credentials.get("Dexcom", {})
-            if credentials.get("username") and credentials.get("password"):
-                self.authenticate_dexcom(credentials["username"], credentials["password"])
-            else:
-                self.show_login_window()
-        elif self.data_source == "Nightscout":
-            credentials = all_credentials.get("Nightscout", {})
-            if credentials.get("url"):
-                self.nightscout_url = credentials["url"]
-                self.nightscout_api_secret = credentials.get("api_secret")
+        try:
+            if path == self.CURRENT_PATH:
+                readings = self.server.store.query(1)
+            elif path in self.ENTRY_PATHS:
+                readings = self.server.store.query(int(params.get("count", 10)), *self.date_bounds(params))
             else:
-                self.show_login_window()
+                self.send_error(404)
+                return
+        except ValueError:
+            self.send_error(400, "Invalid count or date filter")
+            return
 
-    def generate_key(self):
-        """Generate a new encryption key with secure permissions."""
-        key = Fernet.generate_key()
-        with open(self.key_file_path, 'wb') as key_file:
-            key_file.write(key)
-        # Set restrictive file permissions
-        self.set_file_permissions(self.key_file_path)
-        return key
+        entries = [reading.to_nightscout() for reading in readings]
+        if as_json:
+            self.send_body(json.dumps(entries), "application/json")
+        else:
+            lines = [
+                f'"{e["dateString"]}"\t{e["date"]}\t{e["sgv"]}\t"{e["direction"]}"\t"{e["device"]}"'
+                for e in entries
+            ]
+            self.send_body("\n".join(lines), "text/plain")
 
-    def load_key(self):
-        """Load encryption key with validation."""
+    @staticmethod
+    def date_bounds(params):
+        """Convert find[date] filters in epoch milliseconds to inclusive epoch-second bounds."""
+        start = end = None
+        for op, value in params.items():
+            if not op.startswith("find[date]"):
+                continue
+            ms = int(float(value))
+            op = op[len("find[date]"):]
+            if op == "[$gt]":
+                start = max(start or 0, ms // 1000 + 1)
+            elif op == "[$gte]":
+                start = max(start or 0, -(-ms // 1000))
+            elif op == "[$lt]":
+                bound = -(-ms // 1000) - 1
+                end = bound if end is None else min(end, bound)
+            elif op == "[$lte]":
+                bound = ms // 1000
+                end = bound if end is None else min(end, bound)
+        return start, end
+
+    def send_body(self, body, content_type):
+        data = body.encode()
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Local API: {format % args}")
+
+class LocalApiServer(ThreadingHTTPServer):
+    """Localhost-only HTTP server exposing already fetched readings.
+
+    Local consumers (the VS Code extension, scripts, other widgets) read
+    from here instead of logging in and polling upstream themselves.
+    """
+
+    daemon_threads = True
+    DEFAULT_PORT = 17580
+
+    def __init__(self, store, port=DEFAULT_PORT):
+        super().__init__(("127.0.0.1", port), LocalApiHandler)
+        self.store = store
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True, name="LocalApi")
+        self.thread.start()
+        logging.info(f"Local API listening on http://127.0.0.1:{self.server_address[1]}/api/v1/entries.json")
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class HistoryJournal:
+    """Append-only JSON-lines journal kept next to the history.json snapshot.
+
+    Each new reading costs one appended line; the snapshot is only rewritten
+    when the journal is compacted. Loading replays the journal over the
+    snapshot, so records written after the last compaction survive a crash,
+    and a torn last line is cut off instead of failing the load.
+    """
+
+    COMPACT_AFTER = 288  # Records (a day of readings) before compaction
+
+    def __init__(self, snapshot_path, on_create=None):
+        self.snapshot_path = snapshot_path
+        self.path = snapshot_path + ".journal"
+        self.on_create = on_create  # Called with the path when the journal file is created
+        self.records = 0  # Records appended since the last compaction
+        self._file = None
+
+    def replay(self):
+        """Return the journaled (iso timestamp, mg/dL) records in append order."""
         try:
-            # Verify file exists and has content
-            if not os.path.exists(self.key_file_path) or os.path.getsize(self.key_file_path) == 0:
-                return self.generate_key()
-            
-            with open(self.key_file_path, 'rb') as key_file:
-                key = key_file.read()
-                
-            # Validate key format
-            if len(key) != 44:  # Fernet keys are 44 bytes in base64
-                logging.warning("Invalid key format detected, generating new key")
-                return self.generate_key()
-                
-            return key
-        except Exception as e:
-            logging.error(f"Key loading error: {e}")
-            return self.generate_key()
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        valid_size = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                timestamp, glucose = json.loads(line)
+            except (ValueError, TypeError):
+                break
+            entries.append((timestamp, glucose))
+            valid_size += len(line)
+
+        if valid_size < len(data):
+            logging.warning(f"Dropping {len(data) - valid_size} bytes of torn history journal")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        self.records = len(entries)
+        return entries
+
+    def append(self, entries):
+        """Append (datetime, mg/dL) entries as one write."""
+        if self._file is None:
+            created = not os.path.exists(self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if created and self.on_create:
+                self.on_create(self.path)
+        self._file.write("".join(json.dumps([t.isoformat(), g]) + "\n" for t, g in entries))
+        self._file.flush()
+        self.records += len(entries)
+
+    def reset(self):
+        """Empty the journal once its records are in the snapshot."""
+        self.close()
+        if os.path.exists(self.path):
+            open(self.path, 'w').close()
+        self.records = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def fsync_directory(directory):
+    """Make renames in directory durable (a no-op where directories cannot be opened, e.g. Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, data, sync_directory=True):
+    """Replace path with data (bytes); readers see the old or the new file, never a torn one.
+
+    The temp file comes from tempfile.mkstemp in the target's directory. Its
+    name is unique, so threads writing the same file never share one, and
+    it is created owner-only (0o600), so it is never readable by others and
+    needs no chmod on Unix. The data is fsynced before the rename; pass
+    sync_directory=False when the caller syncs the directory once for a
+    batch of writes.
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if sync_directory:
+        fsync_directory(os.path.dirname(path))
+
+class GlucoseArchive:
+    """Long-term reading archive in monthly columnar files.
+
+    Each UTC month is a pair of raw little-endian columns, YYYY-MM.time
+    (uint32 epoch seconds, sorted) and YYYY-MM.mgdl (uint16), six bytes per
+    reading. Columns are opened as read-only numpy memmaps and sliced with
+    searchsorted, so months of data open without parsing anything.
+    In-order readings are appended to the files; an out-of-order batch
+    rewrites its month sorted and de-duplicated.
+    """
+
+    TIME_DTYPE = np.dtype('<u4')
+    VALUE_DTYPE = np.dtype('<u2')
+
+    def __init__(self, directory, on_create=None):
+        self.directory = directory
+        self.on_create = on_create  # Called with each column file path after it is created or replaced
+        # Owner-only like the rest of the data directory; makedirs' mode only applies when creating
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if platform.system() != "Windows":
+            os.chmod(directory, 0o700)
+        if on_create:
+            # Tighten column files written under the default umask
+            for name in os.listdir(directory):
+                if name.endswith((".time", ".mgdl")):
+                    on_create(os.path.join(directory, name))
+
+    @staticmethod
+    def month_of(timestamp):
+        return time.strftime("%Y-%m", time.gmtime(timestamp))
+
+    def _paths(self, month):
+        base = os.path.join(self.directory, month)
+        return base + ".time", base + ".mgdl"
+
+    def months(self):
+        """Archived months in ascending order."""
+        return sorted(name[:-len(".time")] for name in os.listdir(self.directory) if name.endswith(".time"))
+
+    def _columns(self, month):
+        """Memory-map a month's columns, trimmed to their common length after a torn write."""
+        time_path, value_path = self._paths(month)
+        try:
+            count = min(os.path.getsize(time_path) // self.TIME_DTYPE.itemsize,
+                        os.path.getsize(value_path) // self.VALUE_DTYPE.itemsize)
+        except OSError:
+            count = 0
+        if count == 0:
+            return np.empty(0, self.TIME_DTYPE), np.empty(0, self.VALUE_DTYPE)
+        return (np.memmap(time_path, self.TIME_DTYPE, mode='r', shape=(count,)),
+                np.memmap(value_path, self.VALUE_DTYPE, mode='r', shape=(count,)))
+
+    def append(self, readings):
+        """Archive Readings, skipping ones already stored; returns how many were new."""
+        added = 0
+        by_month = {}
+        for reading in readings:
+            by_month.setdefault(self.month_of(reading.timestamp), []).append(reading)
+
+        for month, batch in by_month.items():
+            times = np.array([r.timestamp for r in batch], dtype=self.TIME_DTYPE)
+            values = np.array([min(max(r.mg_dl, 0), 0xFFFF) for r in batch], dtype=self.VALUE_DTYPE)
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+
+            old_times, old_values = self._columns(month)
+            count = len(old_times)
+            if count:
+                # The newest reading is usually re-seen on every poll
+                at = np.minimum(np.searchsorted(old_times, times), count - 1)
+                fresh = old_times[at] != times
+                times, values = times[fresh], values[fresh]
+                if len(times) == 0:
+                    continue
+            in_order = (count == 0 or times[0] > old_times[-1]) and np.all(np.diff(times.astype(np.int64)) > 0)
+            if in_order:
+                del old_times, old_values
+                self._append_columns(month, count, times, values)
+                added += len(times)
+            else:
+                merged_times = np.concatenate([np.asarray(old_times), times])
+                merged_values = np.concatenate([np.asarray(old_values), values])
+                del old_times, old_values
+                # First occurrence wins, so readings already archived are kept
+                merged_times, first = np.unique(merged_times, return_index=True)
+                self._rewrite_columns(month, merged_times, merged_values[first])
+                added += len(merged_times) - count
+        return added
+
+    def _append_columns(self, month, count, times, values):
+        for path, column in zip(self._paths(month), (times, values)):
+            created = not os.path.exists(path)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o600)
+            with os.fdopen(fd, 'ab') as f:
+                # Drop any torn tail so both columns stay the same length
+                f.truncate(count * column.itemsize)
+                f.write(column.tobytes())
+            if created and self.on_create:
+                self.on_create(path)
+
+    def _rewrite_columns(self, month, times, values):
+        for path, column in zip(self._paths(month), (times, values)):
+            atomic_write(path, column.tobytes(), sync_directory=False)
+            if self.on_create:
+                self.on_create(path)
+        fsync_directory(self.directory)
+
+    def slice(self, start, end):
+        """Return (epoch seconds, mg/dL) arrays for start <= time <= end."""
+        first, last = self.month_of(start), self.month_of(end)
+        time_parts, value_parts = [], []
+        for month in self.months():
+            if month < first or month > last:
+                continue
+            times, values = self._columns(month)
+            lo = np.searchsorted(times, start, side='left')
+            hi = np.searchsorted(times, end, side='right')
+            time_parts.append(np.array(times[lo:hi]))
+            value_parts.append(np.array(values[lo:hi]))
+        if not time_parts:
+            return np.empty(0, self.TIME_DTYPE), np.empty(0, self.VALUE_DTYPE)
+        return np.concatenate(time_parts), np.concatenate(value_parts)
+
+class PersistenceManager:
+    """Write-behind store for the files in the app support directory.
+
+    Each section (settings, credentials, history) is held in memory. Callers
+    replace its value and the section is marked dirty; flush() writes every
+    dirty section in one batch with atomic_write and syncs each directory
+    once. The owner calls flush() on a timer and at shutdown, so a burst of
+    changes costs one write per file.
+    """
+
+    FLUSH_INTERVAL = 30  # Seconds between timed flushes
+
+    def __init__(self, on_written=None):
+        self.on_written = on_written  # Called with each path after it is replaced
+        self._sections = {}  # name -> (path, dump, load, after_write)
+        self._values = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.flushes = 0  # Flushes that wrote at least one file
+        self.files_written = 0
+        self.bytes_written = 0
+
+    def register(self, name, path, dump, load, after_write=None):
+        """Add a section; dump(value) -> bytes, load(bytes) -> value."""
+        self._sections[name] = (path, dump, load, after_write)
+
+    def move(self, name, path):
+        """Point a section at another file (replay runs keep history in a temp dir)."""
+        with self._lock:
+            _, dump, load, after_write = self._sections[name]
+            self._sections[name] = (path, dump, load, after_write)
+            self._values.pop(name, None)
+
+    def get(self, name):
+        """Current value of a section, read from disk the first time."""
+        with self._lock:
+            if name not in self._values:
+                path, _, load, _ = self._sections[name]
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    self._values[name] = load(data) if data else None
+                except FileNotFoundError:
+                    self._values[name] = None
+                except Exception as e:
+                    logging.error(f"Error loading {os.path.basename(path)}: {e}")
+                    self._values[name] = None
+            return self._values[name]
+
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+            self._dirty.add(name)
+
+    def mark_dirty(self, name):
+        with self._lock:
+            self._dirty.add(name)
+
+    def discard(self, name):
+        """Forget a section's value and any pending write (the caller removes the file)."""
+        with self._lock:
+            self._values[name] = None
+            self._dirty.discard(name)
+
+    @property
+    def dirty(self):
+        return bool(self._dirty)
+
+    def flush(self):
+        """Write all dirty sections; returns False if any write failed (it stays dirty)."""
+        with self._lock:
+            pending = [(name, self._values.get(name)) for name in self._dirty]
+            self._dirty.clear()
+        if not pending:
+            return True
+
+        ok = True
+        written = []
+        for name, value in pending:
+            path, dump, _, after_write = self._sections[name]
+            try:
+                data = dump(value)
+                atomic_write(path, data, sync_directory=False)
+            except Exception as e:
+                logging.error(f"Error writing {os.path.basename(path)}: {e}")
+                with self._lock:
+                    self._dirty.add(name)
+                ok = False
+                continue
+            if self.on_written:
+                self.on_written(path)
+            if after_write:
+                after_write()
+            written.append(path)
+            self.files_written += 1
+            self.bytes_written += len(data)
+
+        for directory in {os.path.dirname(p) for p in written}:
+            try:
+                fsync_directory(directory)
+            except OSError as e:
+                logging.warning(f"Directory sync failed for {directory}: {e}")
+
+        if written:
+            self.flushes += 1
+            logging.debug(
+                f"Flushed {', '.join(os.path.basename(p) for p in written)} "
+                f"({self.files_written} files, {self.bytes_written} bytes since startup)"
+            )
+        return ok
+
+class Settings:
+    """settings.json as typed attributes, loaded once and shared by the app.
+
+    Reads are attribute lookups. update() changes fields, hands the result
+    to the PersistenceManager (the only writer of settings.json) and then
+    calls each observer with the set of field names that changed. Keys this
+    version does not know, such as pre-encryption credentials, are kept in
+    extra and written back untouched.
+    """
+
+    FIELDS = (
+        "data_source", "region", "unit", "min_value", "max_value", "opacity", "is_pinned",
+        "last_position", "prediction_enabled", "nightscout_push", "local_api_enabled",
+        "local_api_port", "followed_accounts",
+    )
+
+    def __init__(self, persistence):
+        self._persistence = persistence
+        self._observers = []
+        self.data_source = ""  # "Dexcom" or "Nightscout"; empty until the user logs in
+        self.region = "us"  # Dexcom Share region: us, ous or jp
+        self.unit = "mmol"  # Display unit: mmol or mgdl
+        self.min_value = None  # Target range in mmol/L regardless of unit
+        self.max_value = None
+        self.opacity = 0.8  # Widget window alpha
+        self.is_pinned = False  # Widget window kept on top
+        self.last_position = None  # {"x", "y", "is_pinned"} of the widget window
+        self.prediction_enabled = True
+        self.nightscout_push = False  # Nightscout real-time updates over socket.io
+        self.local_api_enabled = False
+        self.local_api_port = LocalApiServer.DEFAULT_PORT
+        self.followed_accounts = []  # [{"name", "data_source", "region"}]; credentials are encrypted
+        self.extra = {}
+
+        stored = persistence.get("settings") or {}
+        for key, value in stored.items():
+            if key in self.FIELDS:
+                setattr(self, key, value)
+            else:
+                self.extra[key] = value
+
+    def subscribe(self, observer):
+        """Call observer(changed_names) after every update that changes something."""
+        self._observers.append(observer)
+
+    def to_dict(self):
+        data = dict(self.extra)
+        data.update((name, getattr(self, name)) for name in self.FIELDS)
+        return data
+
+    def update(self, **changes):
+        """Set fields, persist and notify observers; returns the names that changed."""
+        changed = set()
+        for name, value in changes.items():
+            if name not in self.FIELDS:
+                raise AttributeError(f"Unknown setting: {name}")
+            if getattr(self, name) != value:
+                setattr(self, name, copy.deepcopy(value))
+                changed.add(name)
+        if changed:
+            self.save()
+            for observer in self._observers:
+                try:
+                    observer(changed)
+                except Exception as e:
+                    logging.error(f"Settings observer error: {e}")
+        return changed
+
+    def pop_extra(self, key):
+        """Remove and return an unknown key (None if absent), persisting the removal."""
+        if key not in self.extra:
+            return None
+        value = self.extra.pop(key)
+        self.save()
+        return value
 
-    def encrypt_credentials(self, credentials):
+    def save(self):
+        self._persistence.set("settings", copy.deepcopy(self.to_dict()))
+
+def lock_memory(buffer, lock=True):
+    """Best-effort mlock/VirtualLock of a bytearray so it is not swapped to disk."""
+    if not buffer:
+        return False
+    try:
+        address = ctypes.c_void_p(ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer)))
+        size = ctypes.c_size_t(len(buffer))
+        if platform.system() == "Windows":
+            kernel32 = ctypes.windll.kernel32
+            return bool((kernel32.VirtualLock if lock else kernel32.VirtualUnlock)(address, size))
+        libc = ctypes.CDLL(None)
+        return (libc.mlock if lock else libc.munlock)(address, size) == 0
+    except Exception:
+        return False
+
+class CredentialVault:
+    """The encrypted credential store with its crypto context cached.
+
+    unlock() reads the Fernet key from disk into a memory-locked bytearray
+    and builds the one Fernet object from that buffer; both are kept until
+    wipe() zeroes the buffer and drops the cipher. Fernet holds the decoded
+    key halves internally, which Python cannot zero, so the vault never
+    makes any further copy of its own. Decrypted credentials are kept for view_ttl
+    seconds after their last use, then dropped by expire(); the blob is
+    re-encrypted only when a data source's credentials actually change.
+    """
+
+    def __init__(self, persistence, load_key, view_ttl=300):
+        self._persistence = persistence
+        self._load_key = load_key  # Reads (or creates) secret.key
+        self.view_ttl = view_ttl  # Seconds the decrypted view outlives its last use
+        self._key = None  # bytearray, locked in memory where the OS allows
+        self._key_locked = False
+        self._fernet = None
+        self._view = None  # Decrypted credentials, None until needed or after expiry
+        self._view_expires_at = 0
+        self._lock = threading.Lock()
+
+    def unlock(self):
+        """Load the key and build the cipher, once until the next wipe()."""
+        if self._fernet is not None:
+            return
+        key = self._load_key()
+        self._key = key if isinstance(key, bytearray) else bytearray(key)
+        self._key_locked = lock_memory(self._key)
+        # Fernet decodes the buffer itself; no bytes copy of the key is made here
+        self._fernet = Fernet(self._key)
+
+    def _cipher(self):
+        self.unlock()
+        return self._fernet
+
+    def _decrypted(self):
+        """The decrypted view, decrypting the stored blob if it expired."""
+        if self._view is None:
+            encrypted = self._persistence.get("credentials")
+            try:
+                self._view = self.decrypt(encrypted) if encrypted else {}
+            except Exception as e:
+                # Unreadable store: start empty, the next save replaces it
+                logging.error(f"Failed to decrypt credentials: {e}")
+                self._view = {}
+        self._view_expires_at = time.monotonic() + self.view_ttl
+        return self._view
+
+    def encrypt(self, credentials):
         """Encrypt credentials with additional validation."""
-        key = self.load_key()
-        fernet = Fernet(key)
-        
         # Add timestamp to detect stale credentials
         credentials['timestamp'] = datetime.datetime.now().isoformat()
         credential_data = json.dumps(credentials).encode()
@@ -452,14 +1664,11 @@ class GlucoseWidget:
         padding = os.urandom(random.randint(5, 15))
         padded_data = padding + credential_data
         
-        return fernet.encrypt(padded_data)
+        return self._cipher().encrypt(padded_data)
 
-    def decrypt_credentials(self, encrypted_credentials):
+    def decrypt(self, encrypted_credentials):
         """Decrypt credentials with validation checks."""
-        key = self.load_key()
-        fernet = Fernet(key)
-        
-        decrypted = fernet.decrypt(encrypted_credentials)
+        decrypted = self._cipher().decrypt(encrypted_credentials)
         
         # Remove random padding
         try:
@@ -479,114 +1688,1186 @@ class GlucoseWidget:
             
         return credentials
 
-    def get_saved_credentials(self):
-        """Retrieve saved credentials for all data sources."""
+    def get(self, data_source):
+        """A copy of one data source's credentials, or None."""
+        with self._lock:
+            return copy.deepcopy(self._decrypted().get(data_source))
+
+    def update(self, data_source, credentials):
+        """Store one data source's credentials; returns False when nothing changed."""
+        with self._lock:
+            view = self._decrypted()
+            if view.get(data_source) == credentials:
+                return False
+            view[data_source] = copy.deepcopy(credentials)
+            self._persistence.set("credentials", self.encrypt(view))
+            return True
+
+    def clear(self):
+        """Forget all credentials (logout); the caller deletes the file."""
+        with self._lock:
+            self._view = None
+            self._persistence.discard("credentials")
+
+    def expire(self):
+        """Drop the decrypted view once its lifetime has passed."""
+        with self._lock:
+            if self._view is not None and time.monotonic() >= self._view_expires_at:
+                self._view = None
+
+    def wipe(self):
+        """Zero the key and drop the cipher and decrypted view."""
+        with self._lock:
+            self._view = None
+            self._fernet = None
+            if self._key is not None:
+                for i in range(len(self._key)):
+                    self._key[i] = 0
+                if self._key_locked:
+                    lock_memory(self._key, lock=False)
+                self._key = None
+                self._key_locked = False
+
+class GlucoseMonitor:
+    """The GUI-free glucose pipeline: settings, credentials, data-source driver,
+    history, prediction and alerts.
+
+    GlucoseWidget adds the Tk window on top of it; HeadlessMonitor runs it as
+    a daemon without importing tkinter.
+    """
+
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir or app_support_dir  # Replay benchmarks use a scratch directory
+        self.clock = datetime.datetime.now  # Replaced by replay runs that use trace time
+        self.send_notifications = True  # Replay runs build alerts without sending them
+
+        self.data_source = "Dexcom"  # Default data source
+        self.region = "us"
+        self.unit = "mmol"  # Default unit (initialize early to avoid AttributeError)
+        self.prediction_enabled = True  # Default value for prediction_enabled
+        self.prediction_history = []  # Initialize prediction history
+        self.max_history = 6  # Use last 6 readings for prediction
+        self.backfill_minutes = 60  # History pulled in one request at startup and after reconnects
+        self.push_enabled = False  # Nightscout real-time updates over socket.io
+        self.push_listener = None
+        self.push_poll_interval = 900  # Safety poll interval while push is connected
+        self.connection_lost = False  # Set when a poll fails, triggers a backfill on recovery
+        self.gap_threshold = 450  # Seconds between readings that count as a gap (1.5 intervals)
+        self.recovered_readings = 0  # Readings recovered by gap catch-up since startup
+        self.backfill_start = None  # Epoch start of the latest backfill; gap catch-up stops short of it
+
+        # Initialize file paths using helper methods
+        self.key_file_path = self.get_file_path('secret.key')
+        self.credentials_file_path = self.get_file_path('credentials.json')
+        self.settings_file_path = self.get_file_path('settings.json')
+        self.history_file = self.get_file_path('history.json')
+        self._history_journal = None
+
+        # Settings, credentials and history snapshots are written behind
+        self.persistence = PersistenceManager(on_written=self.set_file_permissions)
+        self.persistence.register(
+            "settings", self.settings_file_path,
+            dump=lambda config: json.dumps(config).encode(), load=json.loads
+        )
+        self.persistence.register("credentials", self.credentials_file_path, dump=bytes, load=bytes)
+        # History is snapshotted at flush time, so the journal reset after the
+        # write only drops entries the snapshot contains
+        self.persistence.register(
+            "history", self.history_file,
+            dump=lambda _: json.dumps([(t.isoformat(), g) for t, g in self.prediction_history]).encode(),
+            load=json.loads, after_write=lambda: self.history_journal.reset()
+        )
+
+        # Loaded once; every settings.json read and write goes through it
+        self.settings = Settings(self.persistence)
+
+        # Key and decrypted credentials cached in memory
+        self.vault = CredentialVault(self.persistence, self.load_key)
+
+        # Default target range in mmol
+        self.target_range = (3.9, 12.0)
+        self.last_reading_time = None  # Initialize last reading time to NONE
+        self.driver = None  # Active DataSourceDriver, created on login/configuration
+        self.saved_session_state = None  # Session ids last written to the credential store
+        self.previous_glucose = None
+        self.notifications_snoozed_until = None  # To track the snooze status
+
+        # Polls follow the CGM cadence
+        self.poll_scheduler = PollScheduler()
+
+        # Every reading is kept in the long-term archive
+        self.archive = GlucoseArchive(self.get_file_path('archive'), on_create=self.set_file_permissions)
+
+        # Readings served to local clients by the optional local API
+        self.reading_store = ReadingStore()
+        self.local_api_enabled = False
+        self.local_api_port = LocalApiServer.DEFAULT_PORT
+        self.local_api = None
+
+    def load_settings(self):
+        """Copy the stored settings into the pipeline's working state (once, at startup)."""
+        settings = self.settings
+        min_value = settings.min_value
+        max_value = settings.max_value
+        self.prediction_enabled = settings.prediction_enabled
+        self.push_enabled = settings.nightscout_push
+        self.local_api_enabled = settings.local_api_enabled
+        self.local_api_port = settings.local_api_port
+        self.unit = settings.unit
+
+        # Convert target range to current unit if needed
+        if min_value is not None and max_value is not None:
+            if self.unit == "mgdl":
+                # Convert from stored mmol to mg/dL
+                self.target_range = (min_value * 18.0, max_value * 18.0)
+            else:
+                self.target_range = (min_value, max_value)
+
+    @property
+    def history_journal(self):
+        """The journal for the current history_file (replay runs point it elsewhere)."""
+        if self._history_journal is None or self._history_journal.snapshot_path != self.history_file:
+            if self._history_journal is not None:
+                self._history_journal.close()
+            self._history_journal = HistoryJournal(self.history_file, on_create=self.set_file_permissions)
+        return self._history_journal
+
+    def record_readings(self, readings):
+        """Keep fetched Readings for local clients and in the long-term archive.
+
+        Returns how many were not stored before, according to the archive
+        (the 24h local API store if the archive write fails).
+        """
+        added = self.reading_store.add(readings)
+        try:
+            added = self.archive.append(readings)
+        except Exception as e:
+            logging.error(f"Archive write error: {e}")
+        return added
+
+    def append_history(self, entries):
+        """Record new history entries with one journal append, compacting now and then."""
+        try:
+            self.history_journal.append(entries)
+        except Exception as e:
+            logging.error(f"History journal append error: {e}")
+            self.save_history()
+            return
+        if self.history_journal.records >= HistoryJournal.COMPACT_AFTER:
+            self.save_history()
+
+    def set_driver(self, driver):
+        """Replace the active data-source driver, closing the previous one."""
+        if self.driver is not None and self.driver is not driver:
+            try:
+                self.driver.close()
+            except Exception as e:
+                logging.warning(f"Error closing {self.driver.name} driver: {e}")
+        self.driver = driver
+
+    def update_local_api(self):
+        """Run the local API server exactly while it is enabled."""
+        if self.local_api and (not self.local_api_enabled or self.local_api.server_address[1] != self.local_api_port):
+            self.local_api.stop()
+            self.local_api = None
+        if self.local_api_enabled and self.local_api is None:
+            try:
+                self.local_api = LocalApiServer(self.reading_store, self.local_api_port)
+                self.local_api.start()
+            except OSError as e:
+                logging.error(f"Could not start local API on port {self.local_api_port}: {e}")
+
+    def get_file_path(self, filename):
+        """Get full path for a file in the data directory"""
+        return os.path.join(self.data_dir, filename)
+
+    def get_icon_path(self):
+        """Get path to application icon, copy if needed."""
+        # Use the global app_support_dir that's now defined
+        icon_path = os.path.join(app_support_dir, "logo_png.png")
+        
+        # Only attempt to copy if the icon doesn't exist
+        if not os.path.exists(icon_path):
+            try:
+                # Determine base path for resources
+                if getattr(sys, 'frozen', False):  # Running as a PyInstaller bundle
+                    base_path = sys._MEIPASS
+                else:  # Running as a script
+                    base_path = os.path.dirname(os.path.abspath(__file__))
+                
+                source_icon = os.path.join(base_path, "logo_png.png")
+                
+                if os.path.exists(source_icon):
+                    shutil.copy(source_icon, icon_path)
+                    logging.info(f"Copied application icon to {icon_path}")
+                else:
+                    logging.warning(f"Source icon not found at {source_icon}")
+            except Exception as e:
+                logging.error(f"Error copying icon: {e}")
+        
+        return icon_path
+
+    def convert_png_to_temp_bmp(self, png_path):
+        """Convert PNG to temporary BMP for Windows notifications."""
+        try:
+            if not png_path or not os.path.exists(png_path):
+                return None
+                
+            # Create temp BMP file in application support directory
+            bmp_path = os.path.join(app_support_dir, "temp_notify_icon.bmp")
+            
+            # Open PNG and convert to BMP
+            img = Image.open(png_path)
+            img.save(bmp_path, format='BMP')
+            
+            logging.info(f"Converted PNG to BMP: {bmp_path}")
+            return bmp_path
+        except Exception as e:
+            logging.error(f"PNG to BMP conversion failed: {e}")
+            return None
+
+    def generate_key(self):
+        """Generate a new encryption key with secure permissions."""
+        key = Fernet.generate_key()
+        # Created owner-only, so the key is never briefly readable by others
+        atomic_write(self.key_file_path, key)
+        self.set_file_permissions(self.key_file_path)
+        return key
+
+    def load_key(self):
+        """Load encryption key with validation."""
+        try:
+            # Verify file exists and has content
+            if not os.path.exists(self.key_file_path) or os.path.getsize(self.key_file_path) == 0:
+                return self.generate_key()
+            
+            # Read straight into a bytearray the credential vault can wipe
+            key = bytearray(44)  # Fernet keys are 44 bytes in base64
+            with open(self.key_file_path, 'rb') as key_file:
+                size = key_file.readinto(key)
+                trailing = key_file.read(1)
+                
+            # Validate key format
+            if size != len(key) or trailing:
+                logging.warning("Invalid key format detected, generating new key")
+                return self.generate_key()
+                
+            return key
+        except Exception as e:
+            logging.error(f"Key loading error: {e}")
+            return self.generate_key()
+
+    def get_saved_credentials(self):
+        """Retrieve saved credentials for all data sources."""
+        try:
+            # Served from the vault's decrypted view
+            return {
+                "Dexcom": self.vault.get("Dexcom"),
+                "Nightscout": self.vault.get("Nightscout"),
+                "Followed": self.vault.get("Followed")
+            }
+        except Exception as e:
+            logging.error(f"Failed to retrieve saved credentials: {e}")
+            return {}
+
+    def save_credentials(self, data_source, credentials):
+        """Save credentials for a specific data source."""
+        # Re-encrypted and queued for the next flush only if they changed
+        if self.vault.update(data_source, credentials):
+            logging.info(f"Saved credentials for {data_source}")
+
+    def load_history(self):
+        """Load prediction history from the snapshot file and replay the journal over it."""
+        history = {}
+        try:
+            history.update((t, g) for t, g in self.persistence.get("history") or [])
+        except Exception as e:
+            logging.error(f"History load error: {e}")
+        try:
+            history.update(self.history_journal.replay())
+        except Exception as e:
+            logging.error(f"History journal replay error: {e}")
+        if not history:
+            return None
+        return sorted((datetime.datetime.fromisoformat(t), g) for t, g in history.items())
+
+    def save_history(self):
+        """Queue a history compaction: the snapshot is rewritten and the journal emptied on the next flush."""
+        self.persistence.mark_dirty("history")
+
+    def persist_session_state(self):
+        """Save the driver's login session to the encrypted store if it changed."""
+        state = self.driver.session_state() if self.driver else None
+        if not state or state == self.saved_session_state:
+            return
+        credentials = self.get_saved_credentials().get(self.data_source) or {}
+        if not credentials:
+            return
+        credentials.update(state)
+        self.save_credentials(self.data_source, credentials)
+        self.saved_session_state = state
+
+    @staticmethod
+    def fetch_history(driver, start, end, max_count):
+        """Fetch a range of Readings from driver (runs on the acquisition worker)."""
+        with driver.lock:
+            return driver, driver.fetch_range(start, end, max_count)
+
+    def merge_history(self, readings):
+        """Store Readings and merge the recent ones into the prediction history.
+
+        Every reading is kept in the archive, including ones older than the
+        60-minute prediction window (e.g. recovered after a long sleep).
+        Returns the number of readings that were not already stored.
+        """
+        stored = self.record_readings(readings)
+        cutoff = self.clock() - datetime.timedelta(minutes=60)
+        merged = dict(self.prediction_history)
+        added = []
+        for reading in readings:
+            t = reading.datetime
+            if t >= cutoff and t not in merged:
+                merged[t] = float(reading.mg_dl)
+                added.append((t, merged[t]))
+        self.prediction_history = sorted(merged.items())
+        if added:
+            self.append_history(added)
+        return stored
+
+    def next_poll_delay(self):
+        """Seconds until the primary source should be polled again."""
+        delay = self.poll_scheduler.next_delay()
+        if self.push_listener and self.push_listener.connected:
+            # Readings arrive over the socket; only an occasional safety poll
+            delay = max(delay, self.push_poll_interval)
+        if self.driver:
+            delay = max(delay, self.driver.breaker.seconds_until_retry())
+        return max(delay, 1)
+
+    @staticmethod
+    def fetch_current_reading(driver):
+        """Fetch the latest Reading from driver (runs on the acquisition worker).
+
+        Returns (driver, reading, error) so a failure is recorded on the
+        breaker of the driver that ran the job, not whichever is current.
+        """
+        try:
+            with driver.lock:
+                return driver, driver.fetch_latest(), None
+        except Exception as e:
+            return driver, None, e
+
+    def get_trend_arrow(self, trend_description):
+        arrows = {
+            "rising quickly": "↑↑",
+            "rising": "↑",
+            "rising slightly": "↗",
+            "steady": "→",
+            "falling slightly": "↘",
+            "falling": "↓",
+            "falling quickly": "↓↓",
+            "unable to determine trend": "?",
+        }
+        return arrows.get(trend_description.lower(), "→")
+
+    def get_windows_notification_icon(self):
+        """Get or create ICO icon for Windows notifications."""
+        ico_path = os.path.join(app_support_dir, "dexmate_notify.ico")
+        
+        # Create ICO file if it doesn't exist
+        if not os.path.exists(ico_path):
+            try:
+                png_path = self.get_icon_path()
+                if png_path and os.path.exists(png_path):
+                    # Convert PNG to ICO
+                    img = Image.open(png_path)
+                    
+                    # Resize to standard notification icon size (64x64)
+                    img = img.resize((64, 64), Image.LANCZOS)
+                    
+                    # Save as ICO
+                    img.save(ico_path, format='ICO')
+                    logging.info(f"Created notification ICO: {ico_path}")
+                else:
+                    logging.warning("Source PNG not available for ICO conversion")
+                    return None
+            except Exception as e:
+                logging.error(f"ICO conversion failed: {e}")
+                return None
+        
+        return ico_path
+
+    def trigger_notification(self, glucose_value, account_name=None):
+        """Send a notification about glucose levels using notifypy with PNG icon."""
+        # Check if notifications are snoozed
+        if self.notifications_snoozed_until and self.clock() < self.notifications_snoozed_until:
+            return
+        
+        title = "DexMate Glucose Alert" if account_name is None else f"DexMate Glucose Alert - {account_name}"
+        unit_label = "mg/dL" if self.unit == "mgdl" else "mmol/L"
+        message = f"Glucose level is {'low' if glucose_value < self.target_range[0] else 'high'}: {glucose_value:.1f} {unit_label}"
+        
+        # Get appropriate icon path
+        icon_path = self.get_icon_path()
+        
+        # Special handling for Windows PNG icons
+        if platform.system() == "Windows" and icon_path:
+            # Windows needs a temporary BMP file for notifypy to work with PNGs
+            icon_path = self.convert_png_to_temp_bmp(icon_path)
+
+        if not self.send_notifications:
+            logging.debug(f"Notification suppressed: {message}")
+            return
+    
+        try:
+            notification = Notify()
+            notification.title = title
+            notification.application_name = "DexMate"
+            notification.message = message
+            
+            if icon_path and os.path.exists(icon_path):
+                notification.icon = icon_path
+                
+            notification.send()
+            logging.info("Notification sent successfully")
+        except Exception as e:
+            logging.error(f"Notification failed: {e}")
+            # Simple fallback without icon
+            try:
+                notification = Notify()
+                notification.title = title
+                notification.message = message
+                notification.send()
+                logging.info("Fallback notification sent successfully")
+            except Exception as fallback_error:
+                logging.error(f"Fallback notification also failed: {fallback_error}")
+
+    def win32_notification(self, title, message):
+        """Fallback notification using Windows API via ctypes."""
+        try:
+            import ctypes
+            
+            # Load Windows API functions
+            ctypes.windll.user32.MessageBoxW(0, message, title, 0)
+            logging.info("Windows API notification sent")
+        except Exception as e:
+            logging.error(f"Windows API notification failed: {e}")
+            # Ultimate fallback to notifypy without icon
+            try:
+                notification = Notify()
+                notification.title = title
+                notification.message = message
+                notification.send()
+            except Exception as fallback_error:
+                logging.error(f"Final fallback notification failed: {fallback_error}")
+
+    def update_prediction_history(self, timestamp, glucose):
+        """Maintain a history of recent glucose readings for prediction"""
+        # Convert glucose to mg/dL for consistent storage
+        if self.unit == "mmol":
+            store_glucose = glucose * 18.0  # Convert to mg/dL
+        else:
+            store_glucose = glucose
+        
+        # Filter out old readings (keep only last 60 minutes)
+        cutoff = self.clock() - datetime.timedelta(minutes=60)
+        self.prediction_history = [
+            (t, g) for t, g in self.prediction_history 
+            if t >= cutoff
+        ]
+        
+        # Add new reading if not duplicate
+        if not self.prediction_history or timestamp != self.prediction_history[-1][0]:
+            self.prediction_history.append((timestamp, store_glucose))
+            logging.info(f"Added to history: {timestamp} - {store_glucose:.1f} mg/dL")
+
+            # One small journal append instead of rewriting history.json
+            self.append_history([(timestamp, store_glucose)])
+
+    def predict_glucose(self):
+        """Predict glucose 15 minutes ahead using time-aware linear regression"""
+        if len(self.prediction_history) < 3:
+            logging.info("Prediction skipped: Not enough history data")
+            return None, None, None, None
+
+        try:
+            # Create a segment of consecutive readings without large gaps
+            segment = []
+            sorted_history = sorted(self.prediction_history, key=lambda x: x[0])
+            
+            # Start from most recent reading and go backward
+            segment.append(sorted_history[-1])
+            for i in range(len(sorted_history)-2, -1, -1):
+                time_gap = (segment[0][0] - sorted_history[i][0]).total_seconds() / 60
+                if time_gap > 15:  # Found a gap larger than 15 minutes
+                    break
+                segment.insert(0, sorted_history[i])  # Add to beginning
+                
+            if len(segment) < 3:
+                logging.info(f"Prediction skipped: Only {len(segment)} consecutive readings")
+                return None, None, None, None
+                
+            timestamps, glucose_vals = zip(*segment)
+            
+            # Log segment being used
+            segment_str = ", ".join(
+                f"{t.strftime('%H:%M')}:{g:.1f}mg/dL" 
+                for t, g in segment
+            )
+            logging.info(f"Using consecutive segment: {segment_str}")
+            
+            # Calculate time differences in minutes from most recent reading
+            base_time = timestamps[-1]  # Most recent reading
+            time_deltas = [(t - base_time).total_seconds() / 60 for t in timestamps]
+            
+            # Prepare data for regression
+            X = np.array(time_deltas).reshape(-1, 1)
+            y = np.array(glucose_vals)
+            
+            # Fit linear regression model
+            model = LinearRegression()
+            model.fit(X, y)
+            
+            # Predict 15 minutes from last reading
+            prediction_mgdl = model.predict([[15]])[0]
+            
+            # Calculate trend and confidence
+            last_glucose = glucose_vals[-1]
+            delta_mgdl = prediction_mgdl - last_glucose
+            slope = model.coef_[0]  # mg/dL per minute
+            
+            # Convert slope to mmol/min for consistent trend thresholds
+            slope_mmol = slope / 18.0
+            
+            # Determine trend arrow
+            if slope_mmol > 0.03: trend = "↑↑"
+            elif slope_mmol > 0.01: trend = "↑"
+            elif slope_mmol < -0.03: trend = "↓↓"
+            elif slope_mmol < -0.01: trend = "↓"
+            else: trend = "→"
+            
+            # Calculate confidence (R² + time span factor)
+            r2 = max(0, model.score(X, y))
+            time_span = (timestamps[-1] - timestamps[0]).total_seconds() / 60
+            confidence = int((r2 * 0.7 + min(1, time_span/30) * 0.3) * 100)
+            
+            # Convert to display unit
+            if self.unit == "mmol":
+                prediction = prediction_mgdl / 18.0
+                delta = delta_mgdl / 18.0
+            else:
+                prediction = prediction_mgdl
+                delta = delta_mgdl
+            
+            # Validate prediction sanity
+            reasonable_min = 2.0 if self.unit == "mmol" else 36.0
+            reasonable_max = 25.0 if self.unit == "mmol" else 450.0
+            
+            if prediction < reasonable_min or prediction > reasonable_max:
+                logging.warning(
+                    f"Discarding implausible prediction: {prediction:.1f} "
+                    f"(min={reasonable_min}, max={reasonable_max})"
+                )
+                return None, None, None, None
+            
+            logging.info(
+                f"Prediction: {last_glucose/18.0 if self.unit == 'mmol' else last_glucose:.1f} → "
+                f"{prediction:.1f} ({trend}), confidence: {confidence}%"
+            )
+            return prediction, delta, trend, confidence
+
+        except Exception as e:
+            logging.error(f"Prediction failed: {e}", exc_info=True)
+            return None, None, None, None
+
+    @staticmethod
+    def set_file_permissions(file_path):
+        """Set secure file permissions for sensitive files."""
+        try:
+            if platform.system() == "Windows":
+                # Remove all access except owner
+                os.chmod(file_path, stat.S_IREAD | stat.S_IWRITE)
+                # Mark as hidden
+                ctypes.windll.kernel32.SetFileAttributesW(file_path, 2)
+            else:
+                # Unix: Restrict to owner only
+                os.chmod(file_path, stat.S_IRUSR | stat.S_IWUSR)
+        except Exception as e:
+            logging.error(f"Permission setting failed: {e}")
+
+    def set_file_permissions(self, path):
+        """Set secure file permissions with Windows-specific fixes.
+
+        Skipped on Unix when the file is already owner-only. On Windows the
+        ACL is rewritten every time: atomic_write replaces the file, so the
+        previous ACL does not carry over.
+        """
+        try:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return
+
+            if platform.system() == "Windows":
+                try:
+                    # Reset read-only attribute if set
+                    ctypes.windll.kernel32.SetFileAttributesW(path, 128)  # FILE_ATTRIBUTE_NORMAL
+                    
+                    # Grant full control to current user
+                    import win32security
+                    import ntsecuritycon
+                    
+                    user, _, _ = win32security.LookupAccountName("", os.getlogin())
+                    sd = win32security.GetFileSecurity(path, win32security.DACL_SECURITY_INFORMATION)
+                    
+                    dacl = win32security.ACL()
+                    dacl.AddAccessAllowedAce(
+                        win32security.ACL_REVISION,
+                        ntsecuritycon.FILE_ALL_ACCESS,
+                        user
+                    )
+                    
+                    sd.SetSecurityDescriptorDacl(1, dacl, 0)
+                    win32security.SetFileSecurity(path, win32security.DACL_SECURITY_INFORMATION, sd)
+                except Exception:
+                    # Fallback to basic permission set
+                    os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+            elif stat.S_ISREG(st.st_mode) and stat.S_IMODE(st.st_mode) & ~(stat.S_IRUSR | stat.S_IWUSR) == 0:
+                return  # Already owner-only (atomic_write creates files this way)
+            else:
+                # Unix: Restrict to owner only
+                os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        except Exception as e:
+            logging.error(f"Permission setting failed for {path}: {e}")
+
+    def safe_write_json(self, file_path, data, retries=3):
+        """Safely write JSON data with Windows permission fixes."""
+        for attempt in range(retries):
+            try:
+                # Create directory if needed
+                dir_path = os.path.dirname(file_path)
+                if dir_path and not os.path.exists(dir_path):
+                    os.makedirs(dir_path, exist_ok=True)
+                    self.set_file_permissions(dir_path)
+            
+                # Owner-only temp file, fsynced and atomically renamed
+                atomic_write(file_path, json.dumps(data).encode())
+
+                # One permission pass (Windows ACL; a stat check on Unix)
+                self.set_file_permissions(file_path)
+                return True
+            except PermissionError as pe:
+                logging.warning(f"Attempt {attempt+1} permission error: {pe}")
+                time.sleep(0.5 * (attempt + 1))
+            except Exception as e:
+                logging.error(f"Write error: {e}")
+                break
+    
+        # Fallback to user's temp directory
+        try:
+            temp_dir = tempfile.gettempdir()
+            fallback_path = os.path.join(temp_dir, os.path.basename(file_path))
+            
+            with open(fallback_path, 'w') as f:
+                json.dump(data, f)
+            
+            logging.warning(f"Used fallback location: {fallback_path}")
+            return True
+        except Exception as e:
+            logging.critical(f"Fallback write failed: {e}")
+            return False
+
+class HeadlessMonitor(GlucoseMonitor):
+    """Runs acquisition, history, prediction and alerts without a GUI.
+
+    Uses the data source, settings and encrypted credentials saved by the
+    GUI. A single thread sleeps until the next poll is due, so the process
+    wakes about once per CGM reading instead of several times a second.
+    Stops cleanly on SIGINT/SIGTERM (e.g. `systemctl --user stop`).
+    """
+
+    def __init__(self, data_dir=None):
+        super().__init__(data_dir)
+        self.stop_event = threading.Event()
+
+        self.load_settings()
+        self.data_source = self.settings.data_source
+        self.region = self.settings.region
+        self.prediction_history = self.load_history() or []
+        logging.info(f"Loaded prediction history: {len(self.prediction_history)} entries")
+
+    def connect(self):
+        """Create the driver from the saved credentials; False if none are configured."""
+        credentials = self.get_saved_credentials().get(self.data_source) or {}
+
+        if self.data_source == "Dexcom" and credentials.get("username") and credentials.get("password"):
+            if credentials.get("account_id") and credentials.get("session_id"):
+                # Skip the two-step Share login by reusing the saved session
+                self.saved_session_state = {
+                    "account_id": credentials["account_id"],
+                    "session_id": credentials["session_id"],
+                }
+                driver = DexcomDriver.restore(
+                    credentials["username"], credentials["password"], self.region,
+                    credentials["account_id"], credentials["session_id"]
+                )
+            else:
+                driver = DexcomDriver.login(credentials["username"], credentials["password"], self.region)
+        elif self.data_source == "Nightscout" and credentials.get("url"):
+            driver = NightscoutDriver(NightscoutClient(credentials["url"], credentials.get("api_secret")))
+        else:
+            return False
+
+        self.set_driver(driver)
+        self.persist_session_state()
+        logging.info(f"Connected to {self.data_source}")
+        return True
+
+    def backfill(self, start, end):
+        """Merge the readings between start and end (epoch seconds) into the history."""
+        readings = self.driver.fetch_range(start, end, (end - start) // 300 + 1)
+        return self.merge_history(readings)
+
+    def poll(self):
+        """Fetch the latest reading and run it through the pipeline."""
+        if not self.driver.breaker.allow():
+            return
+
+        try:
+            reading = self.driver.fetch_latest()
+        except Exception as e:
+            logging.error(f"Error fetching reading: {e}")
+            self.driver.breaker.record_failure()
+            self.poll_scheduler.record_failure()
+            self.connection_lost = True
+            return
+
+        self.driver.breaker.record_success()
+        # The driver may have logged in again after its session was rejected
+        self.persist_session_state()
+        if self.connection_lost:
+            # Reconnected: refill whatever history was missed
+            self.connection_lost = False
+            now = int(time.time())
+            self.backfill_start = now - self.backfill_minutes * 60
+            self.backfill(self.backfill_start, now)
+
+        self.poll_scheduler.record_reading(reading.datetime if reading else None)
+        if reading is not None:
+            self.process_reading(reading)
+
+    def process_reading(self, reading):
+        """Alert on, record and predict from a new reading (the GUI's display_reading)."""
+        bg_datetime = reading.datetime
+        if self.last_reading_time is not None and (bg_datetime - self.last_reading_time).total_seconds() < 60:
+            return
+
+        self.record_readings([reading])
+        glucose_value = reading.mg_dl if self.unit == "mgdl" else reading.mg_dl / 18.0
+        delta = glucose_value - self.previous_glucose if self.previous_glucose is not None else 0.0
+        self.previous_glucose = glucose_value
+        logging.info(
+            f"Glucose {glucose_value:.1f} {self.get_trend_arrow(reading.trend_description)} "
+            f"(delta {delta:+.1f}) at {bg_datetime:%H:%M}"
+        )
+
+        if not self.target_range[0] <= glucose_value <= self.target_range[1]:
+            self.trigger_notification(glucose_value)
+
+        # Recover readings missed while asleep or offline
+        if self.last_reading_time is not None:
+            gap = (bg_datetime - self.last_reading_time).total_seconds()
+            # The backfill just run on connect or reconnect already covers the recent part of the gap
+            start = int(self.last_reading_time.timestamp()) + 1
+            end = int(bg_datetime.timestamp()) - 1
+            if self.backfill_start is not None:
+                end = min(end, self.backfill_start - 1)
+            if gap > self.gap_threshold and end >= start:
+                try:
+                    recovered = self.backfill(start, end)
+                    self.recovered_readings += recovered
+                    logging.info(f"Recovered {recovered} missed readings ({self.recovered_readings} since startup)")
+                except Exception as e:
+                    logging.error(f"Gap catch-up failed: {e}")
+        self.backfill_start = None
+        self.last_reading_time = bg_datetime
+
+        if self.prediction_enabled:
+            self.update_prediction_history(bg_datetime, glucose_value)
+            prediction_value, delta, trend, confidence = self.predict_glucose()
+            if prediction_value is not None:
+                logging.info(f"Prediction (15min): {prediction_value:.1f} ({delta:+.1f} {trend}) [{confidence}%]")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        """Poll until stopped; returns a process exit code."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        logging.info(f"DexMate {VERSION} headless monitor started")
+        self.update_local_api()
+
+        try:
+            while not self.stop_event.is_set():
+                if self.driver is None:
+                    try:
+                        if not self.connect():
+                            logging.error("No data source configured, set one up in the DexMate window first")
+                            return 1
+                        now = int(time.time())
+                        self.backfill_start = now - self.backfill_minutes * 60
+                        self.backfill(self.backfill_start, now)
+                    except Exception as e:
+                        logging.error(f"Connecting to {self.data_source} failed: {e}")
+                        self.poll_scheduler.record_failure()
+                        self.stop_event.wait(self.poll_scheduler.next_delay())
+                        continue
+
+                self.poll()
+                # Polls are the timer here: one flush per reading at most
+                self.persistence.flush()
+                self.vault.expire()
+                self.stop_event.wait(self.next_poll_delay())
+        finally:
+            self.set_driver(None)
+            self.save_history()
+            self.persistence.flush()
+            self.vault.wipe()
+            self.local_api_enabled = False
+            self.update_local_api()
+            logging.info("DexMate headless monitor stopped")
+        return 0
+
+class GlucoseWidget(GlucoseMonitor):
+    def __init__(self, root, driver=None):
+        """Initialize the application.
+
+        If driver is given (e.g. a ReplayDriver) it is used instead of the
+        saved credentials, and the caller drives polling itself.
+        """
+        super().__init__()
+        self.root = root
+        
+        # Initialize attributes
+        self.opacity = 0.8  # Default opacity value
+        # ... other attributes ...
+
+        # Initialize the rest of the class
+        # ... existing code ...
+
+        # Set DexMate logo path
+        self.dexmate_icon_path = self.get_icon_path()
+
+        # Set DexMate logo as window icon
+        if self.dexmate_icon_path and os.path.exists(self.dexmate_icon_path):
+            try:
+                # Windows needs special handling for .ico files
+                if platform.system() == "Windows":
+                    # Convert PNG to ICO in temp directory
+                    ico_path = self.convert_png_to_ico(self.dexmate_icon_path)
+                    if ico_path:
+                        self.root.iconbitmap(ico_path)
+                        logging.info("Windows icon set using ICO")
+                    else:
+                        # Fallback to PNG if conversion fails
+                        self.icon_img = tk.PhotoImage(file=self.dexmate_icon_path)
+                        self.root.iconphoto(True, self.icon_img)
+                        logging.info("Windows icon set using PNG fallback")
+                else:
+                    # Non-Windows platforms can use PNG directly
+                    self.icon_img = tk.PhotoImage(file=self.dexmate_icon_path)
+                    self.root.iconphoto(True, self.icon_img)
+                    logging.info("Main window icon set successfully")
+            except Exception as e:
+                logging.error(f"Error setting window icon: {e}")
+        else:
+            logging.warning("DexMate icon not available")
+
+        self.login_window = None  # Initialize login_window as None
+        self.login_window_created = False  # Track whether the login window has been created
+
+        self.root.title("DexMate")
+        self.root.geometry("300x270")  # Increased height for prediction label
+
+        # Add prediction history before any updates
+        logging.info(f"Max history initialized: {self.max_history}")
+
+        self.label = tk.Label(root, text="Glucose Level:")
+        self.label.pack(pady=5)
+
+        self.glucose_value = tk.StringVar()
+        self.glucose_label = tk.Label(root, textvariable=self.glucose_value, font=("Helvetica", 22))
+        self.glucose_label.pack()
+
+        self.trend_label = tk.Label(root, text="", font=("Helvetica", 22))
+        self.trend_label.pack(pady=5)
+
+        self.time_label = tk.Label(root, text="", font=("Helvetica", 12))
+        self.time_label.pack(pady=5)
+
+        self.delta_label = tk.Label(root, text="", font=("Helvetica", 12))
+        self.delta_label.pack(pady=5)
+
+        # Add prediction label with delta and trend
+        self.prediction_label = tk.Label(root, text="Prediction: --", font=("Helvetica", 12))
+        self.prediction_label.pack(pady=5)
+
+        # Connection status, only shown while the circuit breaker is not closed
+        self.status_label = tk.Label(root, text="", font=("Helvetica", 9), fg="gray")
+
+        self.last_successful_update = None  # Track last successful update time
+
+        # All network I/O runs on a small shared worker pool, results are drained here
+        self.acquisition = AcquisitionWorker(threads=4)
+        self.acquisition.start()
+        self.login_generation = 0  # Bumped per Dexcom login, logout and source change; stale logins are dropped
+        self.login_breaker = CircuitBreaker()  # Backs off retries of a failed primary Dexcom login
+        self.login_retry = None  # (login, args) of a failed primary Dexcom login awaiting retry
+        self.next_login_at = 0  # time.monotonic() of the next primary login retry
+        self.root.after(100, self.process_acquisition_results)
+
+        # Caregiver mode: followed accounts share the pool and poll loop
+        self.followed_accounts = []
+        self.follow_stagger = 3  # Seconds between the first polls of followed accounts
+        # Pooled connections for every Nightscout client, primary and followed
+        # (pydexcom creates its own session and cannot take this one)
+        self.http_session = create_http_session(pool_size=10)
+
+        # Polls follow the CGM cadence; the "minutes ago" label refreshes locally
+        self.next_primary_poll_at = 0  # time.monotonic() of the next primary poll
+        self.poll_controller = PollController(self.root, self.poll_due_accounts, self.next_tick_delay)
+        self.refresh_time_label()
+
+        # Settings, credentials and history changes are written in batches
+        self.root.after(PersistenceManager.FLUSH_INTERVAL * 1000, self.flush_persistence)
+
+        self.locations = [self.set_top_left, self.set_bottom_left, self.set_bottom_right, self.set_top_right]
+        self.current_location = 0
+
+        # Create a frame for the buttons
+        self.button_frame = tk.Frame(root)
+        self.button_frame.pack(pady=5)  # Add padding around the frame
+
+        # Create a button for changing widget location
+        self.location_button = tk.Button(self.button_frame, text="Change Location", command=self.change_location)
+        self.location_button.pack(side="left", padx=10)  # Pack left with some padding
+
+        # Create a settings button
+        self.settings_button = tk.Button(self.button_frame, text="Settings", command=self.open_settings)
+        self.settings_button.pack(side="left", padx=10)  # Pack left with some padding
+
+        # Compact rows for followed accounts, packed above the buttons when used
+        self.accounts_frame = tk.Frame(root)
+
+        # Load saved settings
+        self.load_settings()
+
+        # Load the last saved position with fallbacks
+        self.load_last_position()
+
+        # Always load prediction history
+        self.prediction_history = self.load_history() or []
+        logging.info(f"Loaded prediction history: {len(self.prediction_history)} entries")
+        
+        # Only show prediction UI if enabled
+        if self.prediction_enabled:
+            self.prediction_label.pack(pady=5)
+        else:
+            self.prediction_label.pack_forget()
+
+        if driver is None:
+            # Check if credentials are already saved, if not, show the login window
+            self.check_saved_credentials()
+            self.load_followed_accounts()
+        else:
+            self.data_source = driver.name
+            self.set_driver(driver)
+        self.persist_session_state()
+
+        # Variable to track the pin state
+        self.is_pinned = False
+
+        # Bind the window close event to save the position
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Serve fetched readings to local clients if enabled
+        if driver is None:
+            self.update_local_api()
+
+        # Start the single poll loop once a data source is configured
+        if (self.data_source or self.followed_accounts) and driver is None:
+            # Drivers that need a login backfill once it completes
+            self.request_backfill()
+            self.poll_controller.start()
+        
+        # Check for updates in the background
+        if driver is None:
+            self.check_for_updates()
+
+        # Obfuscate sensitive strings in memory
+        self.OBFUSCATOR = os.urandom(16)
+    
+        # Register cleanup for secure memory wipe
+        import atexit
+        atexit.register(self.secure_cleanup)
+
+        # Verify directory permissions at startup
+        if not self.verify_directory_permissions():
+            messagebox.showwarning(
+                "Permission Issue",
+                f"Couldn't write to data directory:\n{app_support_dir}\n"
+                "Some features may not work properly."
+            )
+
+    def convert_target_range(self, min_val, max_val, from_unit, to_unit):
+        """Convert target range between units"""
+        if from_unit == to_unit:
+            return min_val, max_val
+            
+        if from_unit == "mmol" and to_unit == "mgdl":
+            return min_val * 18.0, max_val * 18.0
+        elif from_unit == "mgdl" and to_unit == "mmol":
+            return min_val / 18.0, max_val / 18.0
+        return min_val, max_val
+
+    def convert_png_to_ico(self, png_path):
+        """Convert PNG to ICO format for Windows icons."""
         try:
-            # Decrypt the credentials file
-            encrypted_credentials = self.load_encrypted_credentials()
-            if not encrypted_credentials:
-                return {}
-            
-            decrypted = self.decrypt_credentials(encrypted_credentials)
-            
-            # Return credentials for both data sources
-            return {
-                "Dexcom": decrypted.get("Dexcom"),
-                "Nightscout": decrypted.get("Nightscout")
-            }
+            # Save the .ico file in the application support directory
+            ico_path = os.path.join(app_support_dir, "dexmate.ico")
+
+            # Open PNG and convert to ICO
+            img = Image.open(png_path)
+            img.save(ico_path, format='ICO')
+
+            logging.info(f"Converted PNG to ICO: {ico_path}")
+            return ico_path
+        except ImportError:
+            logging.warning("Pillow not installed, cannot convert PNG to ICO")
         except Exception as e:
-            logging.error(f"Failed to retrieve saved credentials: {e}")
-            return {}
+            logging.error(f"Error converting PNG to ICO: {e}")
+        return None
 
-    def save_credentials(self, data_source, credentials):
-        """Save credentials for a specific data source."""
-        # Retrieve existing credentials
-        all_credentials = self.get_saved_credentials() or {}
-    
-        # Update credentials for the specified data source
-        all_credentials[data_source] = credentials
-    
-        # Encrypt and save all credentials
-        encrypted = self.encrypt_credentials(all_credentials)
-    
-        # Use atomic write to prevent corruption
-        temp_path = self.credentials_file_path + '.tmp'
-        with open(temp_path, 'wb') as file:
-            file.write(encrypted)
-    
-        # Atomic replace
-        os.replace(temp_path, self.credentials_file_path)
-        self.set_file_permissions(self.credentials_file_path)
+    def toggle_pin_on_top(self):
+        self.is_pinned = not self.is_pinned
+        self.root.wm_attributes("-topmost", self.is_pinned)
+        self.pin_on_top_button.config(text="Unpin" if self.is_pinned else "Pin on Top")
+
+    def check_saved_credentials(self):
+        """Check saved credentials and authenticate if available."""
+        self.data_source = self.settings.data_source  # Empty until the user logs in
+        self.region = self.settings.region
+        self.unit = self.settings.unit
     
-        logging.info(f"Saved credentials for {data_source}")
+        # Show login window if no data source is set
+        if not self.data_source:
+            self.show_login_window()
+            return
+        
+        # Get credentials from ENCRYPTED storage
+        all_credentials = self.get_saved_credentials()
+        
+        if self.data_source == "Dexcom":
+            credentials = all_credentials.get("Dexcom") or {}
+            if credentials.get("username") and credentials.get("password"):
+                if credentials.get("account_id") and credentials.get("session_id"):
+                    # Skip the two-step Share login by reusing the saved session
+                    self.saved_session_state = {
+                        "account_id": credentials["account_id"],
+                        "session_id": credentials["session_id"],
+                    }
+                    self.submit_login(
+                        DexcomDriver.restore, credentials["username"], credentials["password"],
+                        self.region, credentials["account_id"], credentials["session_id"]
+                    )
+                else:
+                    self.authenticate_dexcom(credentials["username"], credentials["password"])
+            else:
+                self.show_login_window()
+        elif self.data_source == "Nightscout":
+            credentials = all_credentials.get("Nightscout", {})
+            if credentials.get("url"):
+                self.set_nightscout_source(credentials["url"], credentials.get("api_secret"))
+            else:
+                self.show_login_window()
 
     def load_settings(self):
-        try:
-            with open(self.settings_file_path, 'r') as settings_file:
-                settings = json.load(settings_file)
-                min_value = settings.get("min_value")
-                max_value = settings.get("max_value")
-                opacity = settings.get("opacity", 0.8)
-                self.prediction_enabled = settings.get("prediction_enabled", True)
-                self.unit = settings.get("unit", "mmol")
-                
-                # Convert target range to current unit if needed
-                if min_value is not None and max_value is not None:
-                    if self.unit == "mgdl":
-                        # Convert from stored mmol to mg/dL
-                        self.target_range = (min_value * 18.0, max_value * 18.0)
-                    else:
-                        self.target_range = (min_value, max_value)
-                if opacity is not None:
-                    self.opacity = opacity
-                    self.root.attributes('-alpha', self.opacity)
-                return settings
-        except FileNotFoundError:
-            # If settings file doesn't exist, keep default values
-            return None
+        super().load_settings()
+        self.apply_opacity()
+        self.settings.subscribe(self.on_settings_changed)
 
-    def load_history(self):
-        """Load prediction history from file."""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    history = json.load(f)
-                    return [(datetime.datetime.fromisoformat(t), g) for t, g in history]
-        except Exception as e:
-            logging.error(f"History load error: {e}")
-        return None
+    def apply_opacity(self):
+        self.opacity = self.settings.opacity
+        self.root.attributes('-alpha', self.opacity)
 
-    def save_history(self):
-        """Save prediction history with robust error handling."""
-        try:
-            history_data = [(t.isoformat(), g) for t, g in self.prediction_history]
-            
-            # Use safe write method with Windows-specific fixes
-            success = self.safe_write_json(self.history_file, history_data)
-            
-            if success:
-                logging.info(f"Saved {len(history_data)} history entries")
-            else:
-                logging.error("History save failed after retries")
-        except Exception as e:
-            logging.error(f"History save error: {e}")
-            # Emergency fallback to memory-only operation
-            self.prediction_history = self.prediction_history[-self.max_history:]
+    def on_settings_changed(self, changed):
+        """Apply window settings changed through Settings.update."""
+        if "opacity" in changed:
+            self.apply_opacity()
 
     def authenticate_dexcom(self, username, password):
-        """Authenticate with Dexcom and initialize session."""
+        """Authenticate with Dexcom on the acquisition worker."""
+        self.submit_login(DexcomDriver.login, username, password, self.region)
+
+    def submit_login(self, login, *args, retry=False):
+        """Start a primary Dexcom login, superseding any login still running.
+
+        A new login (not a retry) starts with a fresh login breaker.
+        """
+        self.login_generation += 1
+        self.login_retry = None
+        if not retry:
+            self.login_breaker = CircuitBreaker()
+        # The key includes the generation so a stale pending login cannot block this one
+        self.acquisition.submit(("primary_login", self.login_generation), self.run_login, self.login_generation, login, *args)
+
+    @staticmethod
+    def run_login(generation, login, *args):
+        """Run login(*args) on the acquisition worker; returns (generation, driver, error, login, args)."""
         try:
-            self.dexcom = Dexcom(username=username, password=password, region=self.region)
-            self.connection_retries = 0  # Reset retry counter on success
-            self.update_labels()
-            self.schedule_update()
-            
-            # Schedule first update immediately
-            self.root.after(100, self.update_labels)
-            
+            return generation, login(*args), None, login, args
         except Exception as e:
-            logging.error(f"Dexcom authentication failed: {e}")
-            messagebox.showerror("Authentication Error", "Failed to authenticate with Dexcom. Please check your credentials.")
+            return generation, None, e, login, args
+
+    def on_dexcom_authenticated(self, generation, driver, error, login=None, args=()):
+        """Install a finished Dexcom driver or schedule a retry of the failed login.
+
+        Logins superseded by a newer login, a logout or a source change are
+        dropped and their driver closed. Failures are retried on the login
+        breaker; only the first one is reported in a dialog.
+        """
+        if generation != self.login_generation:
+            logging.info("Discarding a Dexcom login superseded while it ran")
+            if driver is not None:
+                try:
+                    driver.close()
+                except Exception as e:
+                    logging.warning(f"Error closing discarded Dexcom driver: {e}")
+            return
+
+        if error is not None:
+            logging.error(f"Dexcom authentication failed: {error}")
+            first_failure = self.login_breaker.failures == 0
+            self.login_breaker.record_failure()
+            self.poll_scheduler.record_failure()
+            self.login_retry = (login, args)
+            self.next_login_at = time.monotonic() + max(
+                self.poll_scheduler.next_delay(), self.login_breaker.seconds_until_retry(), 1
+            )
+            # The poll loop may not be running yet after a first login from the login window
+            delay = self.next_tick_delay()
+            self.poll_controller.start(delay)
+            self.poll_controller.reschedule(delay)
+            if first_failure:
+                messagebox.showerror("Authentication Error", "Failed to authenticate with Dexcom. Please check your credentials.")
+            return
+
+        self.login_breaker.record_success()
+        self.poll_scheduler.reset()
+        self.set_driver(driver)
+        self.request_backfill()
+        self.poll_now()
 
     def login(self):
         if isinstance(self.username_entry, tk.Entry) and isinstance(self.password_entry, tk.Entry):
@@ -610,7 +2891,7 @@ class GlucoseWidget:
         
         self.settings_window = tk.Toplevel(self.root)
         self.settings_window.title("Settings")
-        self.settings_window.geometry("300x450")  # Increased height for unit selection
+        self.settings_window.geometry("300x610")  # Increased height for unit selection, push, local API and followed accounts
         
         # Set window icon
         self.set_window_icon(self.settings_window)
@@ -692,6 +2973,32 @@ class GlucoseWidget:
         )
         prediction_check.pack(padx=5, pady=5)
 
+        # Nightscout real-time updates
+        push_frame = ttk.LabelFrame(self.settings_window, text="Nightscout")
+        push_frame.pack(padx=10, pady=5, fill="x")
+
+        self.push_var = tk.BooleanVar(value=self.push_enabled)
+        push_check = ttk.Checkbutton(
+            push_frame,
+            text="Real-time updates (socket.io)",
+            variable=self.push_var
+        )
+        if socketio is None:
+            push_check.state(["disabled"])
+        push_check.pack(padx=5, pady=5)
+
+        # Local API for other local clients
+        api_frame = ttk.LabelFrame(self.settings_window, text="Local API")
+        api_frame.pack(padx=10, pady=5, fill="x")
+
+        self.local_api_var = tk.BooleanVar(value=self.local_api_enabled)
+        api_check = ttk.Checkbutton(
+            api_frame,
+            text=f"Share readings on localhost:{self.local_api_port}",
+            variable=self.local_api_var
+        )
+        api_check.pack(padx=5, pady=5)
+
         # Buttons Frame
         button_frame = ttk.Frame(self.settings_window)
         button_frame.pack(pady=10)
@@ -701,7 +3008,7 @@ class GlucoseWidget:
         save_button.grid(row=0, column=0, padx=5)
 
         # Manual Update Button
-        update_button = ttk.Button(button_frame, text="Update Now", command=self.update_labels)
+        update_button = ttk.Button(button_frame, text="Update Now", command=self.poll_now)
         update_button.grid(row=0, column=1, padx=5)
 
         # Pin on Top Button
@@ -721,10 +3028,15 @@ class GlucoseWidget:
         open_dir_button = ttk.Button(button_frame, text="Open Data Folder", command=self.open_data_directory)
         open_dir_button.grid(row=3, column=0, columnspan=2, pady=5)
 
+        # Caregiver mode: follow additional accounts
+        followed_button = ttk.Button(button_frame, text="Followed Accounts", command=self.open_followed_accounts)
+        followed_button.grid(row=4, column=0, columnspan=2, pady=5)
+
     def logout(self):
         """Log out the user and reset session variables."""
         try:
             # Delete credentials file
+            self.vault.clear()
             if os.path.exists(self.credentials_file_path):
                 try:
                     os.remove(self.credentials_file_path)
@@ -734,16 +3046,16 @@ class GlucoseWidget:
                         f.write("")
                     logging.info("Overwrote credentials file instead")
 
-            # Reset data source in config
-            config = self.load_config() or {}
-            config["data_source"] = ""  # Clear data source
-            
-            # Save the updated config
-            self.save_config(config)
+            # Reset data source in config; followed credentials are gone with the file
+            self.settings.update(data_source="", followed_accounts=[])
 
-            # Reset session variables
+            # Reset session variables; followed credentials were deleted too
+            self.login_generation += 1  # Drop any Dexcom login still running
+            self.login_retry = None
+            self.poll_controller.stop()
+            self.clear_followed_accounts()
             self.data_source = ""
-            self.dexcom = None
+            self.set_driver(None)
             self.nightscout_url = None
             self.nightscout_api_secret = None
             self.previous_glucose = None
@@ -769,19 +3081,23 @@ class GlucoseWidget:
         self.last_reading_time = None
         self.previous_glucose = None
         self.prediction_history = []
+        self.poll_scheduler.reset()
 
     def secure_cleanup(self):
         """Securely wipe sensitive data from memory on exit"""
         try:
-            # Wipe Dexcom session if it exists
-            if hasattr(self, 'dexcom') and self.dexcom:
+            # Close the data-source session if it exists
+            if getattr(self, 'push_listener', None):
+                self.push_listener.stop()
+                self.push_listener = None
+            if getattr(self, 'driver', None):
                 try:
-                    # Try to properly log out if possible
-                    if hasattr(self.dexcom, 'logout'):
-                        self.dexcom.logout()
+                    self.driver.close()
                 except Exception:
                     pass
-                self.dexcom = None
+                self.driver = None
+            for account in getattr(self, 'followed_accounts', []):
+                account.close()
             
             # Wipe Nightscout credentials
             if hasattr(self, 'nightscout_api_secret') and self.nightscout_api_secret:
@@ -798,6 +3114,10 @@ class GlucoseWidget:
                     for i in range(len(secret_bytes)):
                         secret_bytes[i] = 0
                     self.nightscout_api_secret = None
+
+            # Zero the credential key and drop decrypted credentials
+            if getattr(self, 'vault', None):
+                self.vault.wipe()
             
             # Wipe other sensitive attributes
             sensitive_attrs = ['_credentials', 'OBFUSCATOR']
@@ -838,8 +3158,6 @@ class GlucoseWidget:
             if new_min < new_max and 0.0 <= new_opacity <= 1.0:
                 # Update current target range with new values (in current unit)
                 self.target_range = (new_min, new_max)
-                self.opacity = new_opacity
-                self.root.attributes('-alpha', self.opacity)  # Apply the new opacity
                 self.is_pinned = self.root.wm_attributes("-topmost")
                 
                 # Update prediction enabled state
@@ -854,16 +3172,24 @@ class GlucoseWidget:
                 else:
                     self.prediction_label.pack_forget()
                 
+                # Start or stop Nightscout push
+                if self.push_var.get() != self.push_enabled:
+                    self.push_enabled = self.push_var.get()
+                    self.update_push_listener()
+
+                # Start or stop the local API
+                if self.local_api_var.get() != self.local_api_enabled:
+                    self.local_api_enabled = self.local_api_var.get()
+                    self.update_local_api()
+
                 # Handle unit change
                 new_unit = self.unit_var.get()
                 if new_unit != self.unit:
                     self.unit = new_unit
                     self.prediction_history = []  # Clear prediction history on unit change
                     logging.info("Unit changed - cleared prediction history")
+                    self.request_backfill()
 
-                # Save to config
-                config = self.load_config() or {}
-                
                 # Store target range in mmol format regardless of current unit
                 if new_unit == "mgdl":
                     stored_min = new_min / 18.0
@@ -871,18 +3197,19 @@ class GlucoseWidget:
                 else:
                     stored_min = new_min
                     stored_max = new_max
-                    
-                config["min_value"] = stored_min
-                config["max_value"] = stored_max
-                config["opacity"] = self.opacity
-                config["is_pinned"] = self.is_pinned
-                config["prediction_enabled"] = self.prediction_enabled
-                config["unit"] = new_unit
-                self.unit = new_unit  # Update current unit
 
-                with open(self.settings_file_path, 'w') as settings_file:
-                    json.dump(config, settings_file)
-                self.set_file_permissions(self.settings_file_path)
+                self.unit = new_unit  # Update current unit
+                # Observers apply the new opacity
+                self.settings.update(
+                    min_value=stored_min,
+                    max_value=stored_max,
+                    opacity=new_opacity,
+                    is_pinned=self.is_pinned,
+                    prediction_enabled=self.prediction_enabled,
+                    nightscout_push=self.push_enabled,
+                    local_api_enabled=self.local_api_enabled,
+                    unit=new_unit,
+                )
                 
                 # Show or hide prediction label based on new setting
                 if self.prediction_enabled:
@@ -898,226 +3225,547 @@ class GlucoseWidget:
             messagebox.showerror("Invalid Input", "Please enter valid numbers for the target range and opacity.")
 
     def update_labels(self):
-        """Update labels with current glucose and prediction data."""
+        """Request a fresh reading from the acquisition worker."""
         try:
-            # Skip updates if no data source is set
-            if not self.data_source:
+            # Skip updates until a data source is connected
+            if not self.driver:
                 return
-            
-            glucose_value = None
-            bg = None
-            color = "black"
-
-            try:
-                if self.data_source == "Dexcom" and self.dexcom:
-                    # Add retry logic for connection issues
-                    try:
-                        bg = self.dexcom.get_current_glucose_reading()
-                        self.connection_retries = 0  # Reset on success
-                    except (requests.exceptions.ConnectionError, requests.exceptions.RequestException) as e:
-                        self.connection_retries += 1
-                        if self.connection_retries <= self.max_retries:
-                            logging.warning(f"Connection error (retry {self.connection_retries}/{self.max_retries}): {e}")
-                            time.sleep(2)  # Wait before retrying
-                            return self.update_labels()  # Retry immediately
-                        else:
-                            logging.error(f"Max connection retries reached: {e}")
-                            self.connection_retries = 0
-                            raise
-                elif self.data_source == "Nightscout" and self.nightscout_url:
-                    bg = self.get_nightscout_reading()
-
-                if bg is not None:
-                    # Use correct attributes based on unit setting
-                    if self.unit == "mgdl":
-                        glucose_value = bg.value  # For Dexcom, this is mg_dl
-                    else:
-                        # For mmol units, use mmol_l for Dexcom
-                        if hasattr(bg, 'mmol_l'):
-                            glucose_value = bg.mmol_l
-                        else:
-                            # Convert mg/dL to mmol/L for Nightscout
-                            glucose_value = bg.value / 18.0
-                    
-                    bg_datetime = bg.datetime.replace(tzinfo=None)
-                    current_time = datetime.datetime.now()
-
-                    # Only process if we have a new reading (>= 60 seconds since last)
-                    if self.last_reading_time is None or (bg_datetime - self.last_reading_time).total_seconds() >= 60:
-                        # Calculate delta only when we have a new reading
-                        delta_value = 0.0  # Initialize with default value
-                        if self.previous_glucose is not None:
-                            delta_value = glucose_value - self.previous_glucose
-
-                        # Format delta to one decimal point - safely
-                        try:
-                            delta_text = f"{delta_value:.1f}"
-                        except (TypeError, ValueError):
-                            delta_text = "N/A"
-                        self.delta_label.configure(text=f"Delta: {delta_text}")
-                        self.previous_glucose = glucose_value  # Update previous glucose value
-
-                        # Format glucose value to one decimal point
-                        self.glucose_value.set(f"{glucose_value:.1f}")
-
-                        # Check against target range using native units
-                        if self.target_range[0] <= glucose_value <= self.target_range[1]:
-                            color = "green"
-                        elif glucose_value < self.target_range[0]:
-                            color = "red"
-                            self.trigger_notification(glucose_value)  # Trigger low glucose notification
-                        elif glucose_value > self.target_range[1]:
-                            color = "orange"
-                            self.trigger_notification(glucose_value)  # Trigger high glucose notification
-                        self.glucose_label.configure(fg=color)
-
-                        if hasattr(bg, 'trend_description') and bg.trend_description is not None:
-                            trend_arrow = self.get_trend_arrow(bg.trend_description)
-                            self.trend_label.configure(text=trend_arrow)
-                        else:
-                            self.trend_label.configure(text="Trend N/A")
-
-                        # Only update prediction history if prediction is enabled
-                        if self.prediction_enabled:
-                            self.update_prediction_history(bg_datetime, glucose_value)
-
-                        # Handle predictions
-                        if self.prediction_enabled:
-                            prediction_result = self.predict_glucose()
-                            if prediction_result[0] is not None:  # Check if prediction is available
-                                prediction_value, delta, trend, confidence = prediction_result
-                                
-                                # Format prediction with delta and trend
-                                prediction_text = f"Prediction (15min): {prediction_value:.1f} ({delta:+.1f} {trend})"
-                                if confidence < 90:  # Show confidence if below 90%
-                                    prediction_text += f" [{confidence}%]"
-                                self.prediction_label.config(text=prediction_text)
-                            else:
-                                self.prediction_label.config(text="Prediction: --")
-                
-                        # Update last reading time after processing
-                        self.last_reading_time = bg_datetime
-                    
-                    # Always update time label
-                    self.update_time_label()
 
-            except AttributeError as e:
-                logging.error(f"Dexcom object not initialized or missing attribute: {e}")
-            except Exception as e:
-                logging.error(f"Error updating labels: {e}")
+            # While the circuit is open the data source is not contacted at all
+            if not self.driver.breaker.allow():
+                return
 
+            self.acquisition.submit("current", self.fetch_current_reading, self.driver)
         except Exception as e:
             logging.error(f"Error in update_labels: {e}")
-        finally:
-            # Schedule next update regardless of errors
-            self.root.after(1000, self.update_labels)
 
-    def update_time_label(self):
-        if self.last_reading_time is not None:
-            current_time = datetime.datetime.now()
-            time_diff = current_time - self.last_reading_time
-            minutes_diff = int(time_diff.total_seconds() // 60)
-            self.time_label.configure(text=f"{minutes_diff} minutes ago")
+    def set_driver(self, driver):
+        """Replace the active driver and start or stop the push listener to match."""
+        super().set_driver(driver)
+        self.update_push_listener()
+
+    def update_push_listener(self):
+        """Run a push listener exactly while push is enabled for a Nightscout driver."""
+        listener = self.push_listener
+        wanted = self.push_enabled and socketio is not None and isinstance(self.driver, NightscoutDriver)
+        if listener and (not wanted or listener.driver is not self.driver):
+            listener.stop()
+            self.push_listener = None
+        if wanted and self.push_listener is None:
+            self.push_listener = NightscoutPushListener(self.driver, self.acquisition.results)
+            self.push_listener.start()
+        elif self.push_enabled and socketio is None:
+            logging.warning("python-socketio is not installed, Nightscout push disabled")
+
+    def request_backfill(self):
+        """Ask the acquisition worker for recent history in a single request."""
+        if self.driver:
+            now = int(time.time())
+            start = now - self.backfill_minutes * 60
+            if self.acquisition.submit(
+                "backfill", self.fetch_history, self.driver, start, now, self.backfill_minutes // 5 + 1
+            ):
+                self.backfill_start = start
+
+    def check_reading_gap(self, previous_time, newest_time):
+        """Request the readings between previous_time and newest_time if any are missing."""
+        backfill_start, self.backfill_start = self.backfill_start, None
+        if previous_time is None:
+            return
+        gap = (newest_time - previous_time).total_seconds()
+        if gap > self.gap_threshold:
+            logging.info(f"Detected {gap / 60:.0f} minute gap in readings, requesting catch-up")
+            # Exclusive bounds, both ends are already in the history
+            start = int(previous_time.timestamp()) + 1
+            end = int(newest_time.timestamp()) - 1
+            if backfill_start is not None:
+                # The backfill just requested on login or reconnect already covers the recent part of the gap
+                end = min(end, backfill_start - 1)
+                if end < start:
+                    logging.info("Gap is covered by the backfill, skipping catch-up")
+                    return
+                gap = end - start
+            self.acquisition.submit("catchup", self.fetch_history, self.driver, start, end, int(gap // 300) + 1)
 
-    def get_trend_arrow(self, trend_description):
-        arrows = {
-            "rising quickly": "↑↑",
-            "rising": "↑",
-            "rising slightly": "↗",
-            "steady": "→",
-            "falling slightly": "↘",
-            "falling": "↓",
-            "falling quickly": "↓↓",
-            "unable to determine trend": "?",
-        }
-        return arrows.get(trend_description.lower(), "→")
-    
-    def get_windows_notification_icon(self):
-        """Get or create ICO icon for Windows notifications."""
-        ico_path = os.path.join(app_support_dir, "dexmate_notify.ico")
-        
-        # Create ICO file if it doesn't exist
-        if not os.path.exists(ico_path):
-            try:
-                png_path = self.get_icon_path()
-                if png_path and os.path.exists(png_path):
-                    # Convert PNG to ICO
-                    img = Image.open(png_path)
-                    
-                    # Resize to standard notification icon size (64x64)
-                    img = img.resize((64, 64), Image.LANCZOS)
-                    
-                    # Save as ICO
-                    img.save(ico_path, format='ICO')
-                    logging.info(f"Created notification ICO: {ico_path}")
-                else:
-                    logging.warning("Source PNG not available for ICO conversion")
-                    return None
-            except Exception as e:
-                logging.error(f"ICO conversion failed: {e}")
-                return None
-        
-        return ico_path
+    def load_backfill(self, readings):
+        """Bulk-load backfilled readings into the prediction history."""
+        self.merge_history(readings)
+        logging.info(f"Backfilled {len(readings)} readings, history now {len(self.prediction_history)} entries")
 
-    def trigger_notification(self, glucose_value):
-        """Send a notification about glucose levels using notifypy with PNG icon."""
-        # Check if notifications are snoozed
-        if self.notifications_snoozed_until and datetime.datetime.now() < self.notifications_snoozed_until:
-            return
-        
-        title = "DexMate Glucose Alert"
-        unit_label = "mg/dL" if self.unit == "mgdl" else "mmol/L"
-        message = f"Glucose level is {'low' if glucose_value < self.target_range[0] else 'high'}: {glucose_value:.1f} {unit_label}"
-        
-        # Get appropriate icon path
-        icon_path = self.get_icon_path()
-        
-        # Special handling for Windows PNG icons
-        if platform.system() == "Windows" and icon_path:
-            # Windows needs a temporary BMP file for notifypy to work with PNGs
-            icon_path = self.convert_png_to_temp_bmp(icon_path)
-    
+        if self.prediction_enabled:
+            self.update_prediction_label()
+
+    def load_recovered_readings(self, readings):
+        """Merge readings recovered by gap catch-up and update the recovery metric."""
+        recovered = self.merge_history(readings)
+        self.recovered_readings += recovered
+        logging.info(
+            f"Recovered {recovered} missed readings "
+            f"({self.recovered_readings} recovered since startup)"
+        )
+
+        if self.prediction_enabled:
+            self.update_prediction_label()
+
+    def update_prediction_label(self):
+        """Render the current prediction, or a placeholder if none is available."""
+        prediction_result = self.predict_glucose()
+        if prediction_result[0] is not None:  # Check if prediction is available
+            prediction_value, delta, trend, confidence = prediction_result
+
+            # Format prediction with delta and trend
+            prediction_text = f"Prediction (15min): {prediction_value:.1f} ({delta:+.1f} {trend})"
+            if confidence < 90:  # Show confidence if below 90%
+                prediction_text += f" [{confidence}%]"
+            self.prediction_label.config(text=prediction_text)
+        else:
+            self.prediction_label.config(text="Prediction: --")
+
+    def poll_due_accounts(self):
+        """Poll the primary source and every followed account whose poll is due."""
+        now = time.monotonic()
+        if now >= self.next_primary_poll_at:
+            self.next_primary_poll_at = now + self.next_poll_delay()
+            self.update_labels()
+        if self.login_retry and now >= self.next_login_at:
+            self.next_login_at = now + max(self.login_breaker.seconds_until_retry(), 1)
+            if self.login_breaker.allow():
+                login, args = self.login_retry
+                self.submit_login(login, *args, retry=True)
+
+        for account in self.followed_accounts:
+            if now < account.next_poll_at:
+                continue
+            if account.driver:
+                account.next_poll_at = now + account.next_poll_delay()
+                if account.driver.breaker.allow():
+                    self.acquisition.submit(("current", account.name), self.fetch_current_reading, account.driver)
+            elif account.needs_login:
+                account.next_poll_at = now + account.next_poll_delay()
+                if account.breaker.allow():
+                    credentials = (self.get_saved_credentials().get("Followed") or {}).get(account.name) or {}
+                    self.connect_followed_account(account, credentials)
+
+    def next_tick_delay(self):
+        """Seconds until the earliest primary or followed poll is due."""
+        due = [self.next_primary_poll_at] if self.driver else []
+        if self.login_retry:
+            due.append(self.next_login_at)
+        due += [account.next_poll_at for account in self.followed_accounts if account.driver or account.needs_login]
+        if not due:
+            return PollScheduler.MAX_BACKOFF
+        return max(min(due) - time.monotonic(), 1)
+
+    def schedule_primary_poll(self):
+        """Reschedule the primary poll from the current cadence and breaker state."""
+        self.next_primary_poll_at = time.monotonic() + self.next_poll_delay()
+        self.poll_controller.reschedule(self.next_tick_delay())
+
+    def poll_now(self):
+        """Poll the primary source immediately (login, reconfiguration, Update Now)."""
+        self.next_primary_poll_at = 0
+        self.poll_controller.restart()
+
+    def process_acquisition_results(self):
+        """Drain finished acquisition jobs and apply them on the Tk thread.
+
+        Results from a driver that was replaced or logged out meanwhile are dropped.
+        """
         try:
-            notification = Notify()
-            notification.title = title
-            notification.application_name = "DexMate"
-            notification.message = message
-            
-            if icon_path and os.path.exists(icon_path):
-                notification.icon = icon_path
-                
-            notification.send()
-            logging.info("Notification sent successfully")
+            while True:
+                key, result, error = self.acquisition.results.get_nowait()
+                if isinstance(key, tuple) and key[0] == "primary_login":
+                    if error is not None:
+                        logging.error(f"Dexcom login job failed: {error}")
+                        continue
+                    self.on_dexcom_authenticated(*result)
+                elif isinstance(key, tuple):
+                    self.on_followed_result(key, result, error)
+                elif key == "push":
+                    driver, reading = result
+                    if driver is self.driver:
+                        driver.breaker.record_success()
+                        self.update_status_label()
+                        self.poll_scheduler.record_reading(reading.datetime)
+                        self.schedule_primary_poll()
+                        self.display_reading(reading)
+                elif key == "push_state":
+                    driver, connected = result
+                    if driver is self.driver:
+                        # Stretch the poll interval while connected, poll normally when dropped
+                        self.schedule_primary_poll()
+                elif key == "catchup":
+                    if error is not None:
+                        logging.error(f"Gap catch-up failed: {error}")
+                        continue
+                    driver, readings = result
+                    if driver is self.driver:
+                        self.load_recovered_readings(readings)
+                elif key == "backfill":
+                    if error is not None:
+                        logging.error(f"History backfill failed: {error}")
+                        continue
+                    driver, readings = result
+                    if driver is self.driver:
+                        self.load_backfill(readings)
+                elif key == "current":
+                    if error is not None:
+                        logging.error(f"Error updating labels: {error}")
+                        continue
+                    driver, reading, error = result
+                    if driver is not self.driver:
+                        continue  # Replaced or logged out while the job ran
+                    if error is not None:
+                        driver.breaker.record_failure()
+                        self.poll_scheduler.record_failure()
+                        self.connection_lost = True
+                        self.schedule_primary_poll()
+                        self.update_status_label()
+                        logging.error(f"Error updating labels: {error}")
+                    else:
+                        driver.breaker.record_success()
+                        self.update_status_label()
+                        # The driver may have logged in again after its session was rejected
+                        self.persist_session_state()
+                        if self.connection_lost:
+                            # Reconnected: refill whatever history was missed
+                            self.connection_lost = False
+                            self.request_backfill()
+                        self.poll_scheduler.record_reading(reading.datetime if reading else None)
+                        self.schedule_primary_poll()
+                        self.display_reading(reading)
+        except queue.Empty:
+            pass
         except Exception as e:
-            logging.error(f"Notification failed: {e}")
-            # Simple fallback without icon
-            try:
-                notification = Notify()
-                notification.title = title
-                notification.message = message
-                notification.send()
-                logging.info("Fallback notification sent successfully")
-            except Exception as fallback_error:
-                logging.error(f"Fallback notification also failed: {fallback_error}")
+            logging.error(f"Error processing acquisition results: {e}")
+        finally:
+            self.root.after(100, self.process_acquisition_results)
+
+    def load_followed_accounts(self):
+        """Create drivers and compact rows for the followed accounts in the settings."""
+        credentials = self.get_saved_credentials().get("Followed") or {}
+        start = time.monotonic()
+
+        for index, entry in enumerate(self.settings.followed_accounts):
+            account = FollowedAccount(entry["name"], entry["data_source"], entry.get("region", "us"))
+            # Stagger first polls so several accounts do not hit the network at once
+            account.next_poll_at = start + index * self.follow_stagger
+            self.followed_accounts.append(account)
+            self.create_account_row(account)
+            self.connect_followed_account(account, credentials.get(account.name) or {})
+
+        if self.followed_accounts:
+            self.accounts_frame.pack(before=self.button_frame, fill="x", pady=2)
+            self.root.geometry(f"300x{270 + 24 * len(self.followed_accounts)}")
+            logging.info(f"Following {len(self.followed_accounts)} additional accounts")
+
+    def connect_followed_account(self, account, credentials):
+        """Create the driver for a followed account (Dexcom logs in on the worker pool)."""
+        account.needs_login = False
+        if account.data_source == "Dexcom" and credentials.get("username") and credentials.get("password"):
+            # pydexcom opens its own requests session and cannot use http_session
+            account.status = "Connecting..."
+            self.acquisition.submit(
+                ("login", account.name), DexcomDriver.login,
+                credentials["username"], credentials["password"], account.region
+            )
+        elif account.data_source == "Nightscout" and credentials.get("url"):
+            client = NightscoutClient(credentials["url"], credentials.get("api_secret"), session=self.http_session)
+            account.driver = NightscoutDriver(client)
+            account.status = ""
+        else:
+            account.status = "No credentials"
+        self.update_account_row(account)
+
+    def clear_followed_accounts(self):
+        """Close followed account drivers and remove their rows."""
+        for account in self.followed_accounts:
+            account.close()
+            if account.row:
+                account.row.destroy()
+        self.followed_accounts = []
+        self.accounts_frame.pack_forget()
+        self.root.geometry("300x270")
+
+    def reload_followed_accounts(self):
+        """Rebuild followed accounts after they were edited."""
+        self.clear_followed_accounts()
+        self.load_followed_accounts()
+        if self.data_source or self.followed_accounts:
+            self.poll_controller.start()
+            self.poll_controller.reschedule(self.next_tick_delay())
+
+    def create_account_row(self, account):
+        """Create the compact name / value / age row for a followed account."""
+        account.row = tk.Frame(self.accounts_frame)
+        account.row.pack(fill="x", padx=10)
+        tk.Label(account.row, text=account.name, font=("Helvetica", 10), anchor="w", width=12).pack(side="left")
+        account.value_label = tk.Label(account.row, text="--", font=("Helvetica", 10, "bold"), anchor="w")
+        account.value_label.pack(side="left")
+        account.time_label = tk.Label(account.row, text="", font=("Helvetica", 9), fg="gray")
+        account.time_label.pack(side="right")
+
+    def update_account_row(self, account):
+        """Render a followed account's latest reading or connection status."""
+        if not account.value_label:
+            return
+        status = account.driver.breaker.describe() if account.driver else account.status
+        reading = account.last_reading
+        if reading is None or status:
+            account.value_label.config(text=status or "--", fg="gray")
+        else:
+            value = reading.mg_dl if self.unit == "mgdl" else reading.mg_dl / 18.0
+            if value < self.target_range[0]:
+                color = "red"
+            elif value > self.target_range[1]:
+                color = "orange"
+            else:
+                color = "green"
+            account.value_label.config(text=f"{value:.1f} {self.get_trend_arrow(reading.trend_description)}", fg=color)
+
+        if reading is not None:
+            minutes = int((self.clock() - reading.datetime).total_seconds() // 60)
+            account.time_label.config(text=f"{minutes}m ago")
+
+    def on_followed_result(self, key, result, error):
+        """Apply a finished login or poll for a followed account."""
+        kind, name = key
+        account = next((a for a in self.followed_accounts if a.name == name), None)
+        if account is None:
+            return
 
-    def win32_notification(self, title, message):
-        """Fallback notification using Windows API via ctypes."""
+        if kind == "login":
+            if error is not None:
+                logging.error(f"Login failed for followed account {name}: {error}")
+                account.status = "Login failed"
+                account.breaker.record_failure()
+                account.poll_scheduler.record_failure()
+                account.needs_login = True
+                account.next_poll_at = time.monotonic() + account.next_poll_delay()
+            else:
+                account.breaker.record_success()
+                account.poll_scheduler.reset()
+                account.driver = result
+                account.status = ""
+                account.next_poll_at = time.monotonic()
+        elif kind == "current":
+            if error is not None:
+                logging.error(f"Poll failed for followed account {name}: {error}")
+                return
+            driver, reading, error = result
+            if driver is not account.driver:
+                return  # Account was reconnected while the job ran
+            if error is not None:
+                logging.error(f"Poll failed for followed account {name}: {error}")
+                driver.breaker.record_failure()
+                account.poll_scheduler.record_failure()
+            else:
+                driver.breaker.record_success()
+                account.poll_scheduler.record_reading(reading.datetime if reading else None)
+                previous = account.last_reading
+                if reading is not None and (previous is None or reading.timestamp > previous.timestamp):
+                    account.last_reading = reading
+                    value = reading.mg_dl if self.unit == "mgdl" else reading.mg_dl / 18.0
+                    if not self.target_range[0] <= value <= self.target_range[1]:
+                        self.trigger_notification(value, account.name)
+            account.next_poll_at = time.monotonic() + account.next_poll_delay()
+
+        self.update_account_row(account)
+        self.poll_controller.reschedule(self.next_tick_delay())
+
+    def open_followed_accounts(self):
+        """Open the dialog for adding and removing followed accounts."""
+        window = tk.Toplevel(self.root)
+        window.title("Followed Accounts")
+        window.geometry("320x430")
+        self.set_window_icon(window)
+
+        list_frame = ttk.LabelFrame(window, text="Followed")
+        list_frame.pack(padx=10, pady=5, fill="both", expand=True)
+        listbox = tk.Listbox(list_frame, height=5)
+        listbox.pack(padx=5, pady=5, fill="both", expand=True)
+        for account in self.settings.followed_accounts:
+            listbox.insert(tk.END, account["name"])
+
+        add_frame = ttk.LabelFrame(window, text="Add Account")
+        add_frame.pack(padx=10, pady=5, fill="x")
+
+        ttk.Label(add_frame, text="Name:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
+        name_entry = ttk.Entry(add_frame)
+        name_entry.grid(row=0, column=1, padx=5, pady=2)
+
+        source_var = tk.StringVar(value="Dexcom")
+        first_label = ttk.Label(add_frame, text="Username:")
+        first_label.grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        first_entry = ttk.Entry(add_frame)
+        first_entry.grid(row=2, column=1, padx=5, pady=2)
+        second_label = ttk.Label(add_frame, text="Password:")
+        second_label.grid(row=3, column=0, sticky="w", padx=5, pady=2)
+        second_entry = ttk.Entry(add_frame, show="*")
+        second_entry.grid(row=3, column=1, padx=5, pady=2)
+
+        def on_source_change():
+            dexcom = source_var.get() == "Dexcom"
+            first_label.config(text="Username:" if dexcom else "URL:")
+            second_label.config(text="Password:" if dexcom else "API Secret/Token:")
+
+        source_frame = ttk.Frame(add_frame)
+        source_frame.grid(row=1, column=0, columnspan=2, sticky="w", padx=5)
+        ttk.Radiobutton(source_frame, text="Dexcom", variable=source_var, value="Dexcom",
+                        command=on_source_change).pack(side="left")
+        ttk.Radiobutton(source_frame, text="Nightscout", variable=source_var, value="Nightscout",
+                        command=on_source_change).pack(side="left")
+
+        region_var = tk.StringVar(value="us")
+        region_frame = ttk.Frame(add_frame)
+        region_frame.grid(row=4, column=0, columnspan=2, sticky="w", padx=5)
+        for text, value in (("US", "us"), ("OUS", "ous"), ("Japan", "jp")):
+            ttk.Radiobutton(region_frame, text=text, variable=region_var, value=value).pack(side="left")
+
+        def add_account():
+            name = name_entry.get().strip()
+            first = first_entry.get().strip()
+            second = second_entry.get()
+            source = source_var.get()
+            accounts = self.settings.followed_accounts
+
+            if not name or not first or (source == "Dexcom" and not second):
+                messagebox.showerror("Input Error", "Name and credentials are required.", parent=window)
+                return
+            if any(a["name"] == name for a in accounts):
+                messagebox.showerror("Input Error", f"An account named {name} already exists.", parent=window)
+                return
+
+            if source == "Dexcom":
+                account_credentials = {"username": first, "password": second}
+            else:
+                url = first if first.startswith("http") else "https://" + first
+                account_credentials = {"url": url, "api_secret": second}
+
+            # Credentials go to ENCRYPTED storage, only name/source/region to settings
+            followed = self.get_saved_credentials().get("Followed") or {}
+            followed[name] = account_credentials
+            self.save_credentials("Followed", followed)
+            self.settings.update(
+                followed_accounts=accounts + [{"name": name, "data_source": source, "region": region_var.get()}]
+            )
+
+            listbox.insert(tk.END, name)
+            for entry in (name_entry, first_entry, second_entry):
+                entry.delete(0, tk.END)
+            self.reload_followed_accounts()
+
+        def remove_account():
+            selection = listbox.curselection()
+            if not selection:
+                return
+            name = listbox.get(selection[0])
+            self.settings.update(
+                followed_accounts=[a for a in self.settings.followed_accounts if a["name"] != name]
+            )
+            followed = self.get_saved_credentials().get("Followed") or {}
+            if followed.pop(name, None) is not None:
+                self.save_credentials("Followed", followed)
+            listbox.delete(selection[0])
+            self.reload_followed_accounts()
+
+        ttk.Button(add_frame, text="Add", command=add_account).grid(row=5, column=1, sticky="e", padx=5, pady=5)
+        ttk.Button(list_frame, text="Remove Selected", command=remove_account).pack(pady=5)
+
+    def display_reading(self, reading):
+        """Update labels with a fetched Reading and prediction data."""
         try:
-            import ctypes
-            
-            # Load Windows API functions
-            ctypes.windll.user32.MessageBoxW(0, message, title, 0)
-            logging.info("Windows API notification sent")
+            color = "black"
+
+            if reading is not None:
+                if self.unit == "mgdl":
+                    glucose_value = reading.mg_dl
+                else:
+                    glucose_value = reading.mg_dl / 18.0
+
+                bg_datetime = reading.datetime
+
+                # Only process if we have a new reading (>= 60 seconds since last)
+                if self.last_reading_time is None or (bg_datetime - self.last_reading_time).total_seconds() >= 60:
+                    self.record_readings([reading])
+
+                    # Calculate delta only when we have a new reading
+                    delta_value = 0.0  # Initialize with default value
+                    if self.previous_glucose is not None:
+                        delta_value = glucose_value - self.previous_glucose
+
+                    # Format delta to one decimal point - safely
+                    try:
+                        delta_text = f"{delta_value:.1f}"
+                    except (TypeError, ValueError):
+                        delta_text = "N/A"
+                    self.delta_label.configure(text=f"Delta: {delta_text}")
+                    self.previous_glucose = glucose_value  # Update previous glucose value
+
+                    # Format glucose value to one decimal point
+                    self.glucose_value.set(f"{glucose_value:.1f}")
+
+                    # Check against target range using native units
+                    if self.target_range[0] <= glucose_value <= self.target_range[1]:
+                        color = "green"
+                    elif glucose_value < self.target_range[0]:
+                        color = "red"
+                        self.trigger_notification(glucose_value)  # Trigger low glucose notification
+                    elif glucose_value > self.target_range[1]:
+                        color = "orange"
+                        self.trigger_notification(glucose_value)  # Trigger high glucose notification
+                    self.glucose_label.configure(fg=color)
+
+                    self.trend_label.configure(text=self.get_trend_arrow(reading.trend_description))
+
+                    # Only update prediction history if prediction is enabled
+                    if self.prediction_enabled:
+                        self.update_prediction_history(bg_datetime, glucose_value)
+
+                    # Handle predictions
+                    if self.prediction_enabled:
+                        self.update_prediction_label()
+
+                    # Recover readings missed while asleep or offline
+                    self.check_reading_gap(self.last_reading_time, bg_datetime)
+
+                    # Update last reading time after processing
+                    self.last_reading_time = bg_datetime
+
+                # Always update time label
+                self.update_time_label()
+
         except Exception as e:
-            logging.error(f"Windows API notification failed: {e}")
-            # Ultimate fallback to notifypy without icon
-            try:
-                notification = Notify()
-                notification.title = title
-                notification.message = message
-                notification.send()
-            except Exception as fallback_error:
-                logging.error(f"Final fallback notification failed: {fallback_error}")
+            logging.error(f"Error updating labels: {e}")
+
+    def refresh_time_label(self):
+        """Refresh the "minutes ago" and status labels once a second without any network I/O."""
+        try:
+            self.update_time_label()
+            self.update_status_label()
+            for account in self.followed_accounts:
+                self.update_account_row(account)
+        except Exception as e:
+            logging.error(f"Error refreshing time label: {e}")
+        finally:
+            self.root.after(1000, self.refresh_time_label)
+
+    def update_status_label(self):
+        """Show the circuit breaker state while the data source is unreachable."""
+        status = self.driver.breaker.describe() if self.driver else ""
+        if status:
+            self.status_label.config(text=status)
+            if not self.status_label.winfo_ismapped():
+                self.status_label.pack(before=self.button_frame, pady=2)
+        elif self.status_label.winfo_ismapped():
+            self.status_label.pack_forget()
+
+    def update_time_label(self):
+        if self.last_reading_time is not None:
+            current_time = self.clock()
+            time_diff = current_time - self.last_reading_time
+            minutes_diff = int(time_diff.total_seconds() // 60)
+            self.time_label.configure(text=f"{minutes_diff} minutes ago")
 
     def set_top_left(self):
         """Position the window in the top-left corner of the work area."""
@@ -1150,92 +3798,17 @@ class GlucoseWidget:
         x = work_x + work_width - window_width
         self.root.geometry(f"+{x}+{work_y}")
 
-    def on_close(self):
-        self.save_last_position()
-        self.save_history()  # Save history on exit
-        self.root.destroy()
-
     def change_location(self):
         """Cycle through predefined window positions."""
         self.current_location = (self.current_location + 1) % len(self.locations)
         self.locations[self.current_location]()  # Call the next position method
         logging.info(f"Window moved to position: {self.current_location}")
 
-    def schedule_update(self):
-        self.root.after(1000, self.update_labels)
-
-    def load_config(self):
-        try:
-            if not os.path.exists(self.settings_file_path) or os.path.getsize(self.settings_file_path) == 0:
-                return None
-            with open(self.settings_file_path, 'r') as file:
-                config = json.load(file)
-                return config
-        except Exception as e:
-            logging.error(f"Error loading config: {e}")
-            return None
-
-    def save_config(self, config):
-        try:
-            with open(self.settings_file_path, 'w') as file:
-                json.dump(config, file)
-            self.set_file_permissions(self.settings_file_path)
-        except Exception as e:
-            logging.error(f"Error saving config: {e}")
-
-    def get_nightscout_reading(self):
-        """Fetch the latest glucose reading from Nightscout."""
-        try:
-            endpoint = f"{self.nightscout_url}/api/v1/entries.json?count=2"  # Fetch the last two entries
-            headers = {}
-
-            if self.nightscout_api_secret:
-                hashed_secret = hashlib.sha1(self.nightscout_api_secret.encode()).hexdigest()
-                headers["api-secret"] = hashed_secret
-
-            response = requests.get(endpoint, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            entries = response.json()
-            if not entries or len(entries) < 2:
-                return None
-
-            latest_entry = entries[0]
-            previous_entry = entries[1]
-
-            class NightscoutReading:
-                pass
-
-            reading = NightscoutReading()
-            
-            # Always get value in mg/dL from Nightscout
-            reading.value = latest_entry.get("sgv", 0)
-            reading.datetime = datetime.datetime.fromtimestamp(
-                latest_entry["date"] / 1000
-            ).replace(tzinfo=None)  # Ensure naive datetime
-
-            # Calculate delta
-            previous_glucose = previous_entry.get("sgv", 0)
-            reading.delta = reading.value - previous_glucose
-
-            direction_map = {
-                "DoubleUp": "rising quickly",
-                "SingleUp": "rising",
-                "FortyFiveUp": "rising slightly",
-                "Flat": "steady",
-                "FortyFiveDown": "falling slightly",
-                "SingleDown": "falling",
-                "DoubleDown": "falling quickly",
-                "NOT COMPUTABLE": "unable to determine trend",
-                "RATE OUT OF RANGE": "unable to determine trend"
-            }
-            reading.trend_description = direction_map.get(latest_entry.get("direction", "NOT COMPUTABLE"), "unable to determine trend")
-
-            return reading
-
-        except Exception as e:
-            logging.error(f"Nightscout error: {str(e)}")
-            return None
+    def set_nightscout_source(self, url, api_secret):
+        """Store Nightscout settings and connect a driver on a persistent client."""
+        self.nightscout_url = url
+        self.nightscout_api_secret = api_secret
+        self.set_driver(NightscoutDriver(NightscoutClient(url, api_secret, session=self.http_session)))
 
     def toggle_data_source_fields(self):
         # Clear existing fields
@@ -1266,7 +3839,7 @@ class GlucoseWidget:
             self.ns_url_entry = tk.Entry(self.fields_container)
             self.ns_url_entry.pack(fill='x', pady=5)
 
-            tk.Label(self.fields_container, text="API Secret (if required):").pack(anchor='w')
+            tk.Label(self.fields_container, text="API Secret or Access Token (if required):").pack(anchor='w')
             self.ns_secret_entry = tk.Entry(self.fields_container, show="*")
             self.ns_secret_entry.pack(fill='x', pady=5)
 
@@ -1288,17 +3861,15 @@ class GlucoseWidget:
                 messagebox.showerror("Input Error", "Both username and password are required for Dexcom")
                 return
 
-            # Save credentials to ENCRYPTED storage
+            # Save credentials to ENCRYPTED storage, the new session is added after login
             self.save_credentials("Dexcom", {
                 "username": username,
                 "password": password
             })
+            self.saved_session_state = None
             config["region"] = region
             self.region = region
             self.authenticate_dexcom(username, password)
-            
-            # Trigger immediate update
-            self.root.after(100, self.update_labels)
 
         elif data_source == "Nightscout":
             url = self.ns_url_entry.get().strip()
@@ -1317,14 +3888,14 @@ class GlucoseWidget:
                 "url": url,
                 "api_secret": api_secret
             })
-            self.nightscout_url = url
-            self.nightscout_api_secret = api_secret
-            
-            # Trigger immediate update
-            self.root.after(100, self.update_labels)
+            # A Dexcom login still running must not replace the Nightscout driver
+            # (choosing Dexcom starts a new login, which supersedes it as well)
+            self.login_generation += 1
+            self.login_retry = None
+            self.set_nightscout_source(url, api_secret)
 
         # Save NON-SENSITIVE config only
-        self.save_config(config)
+        self.settings.update(**config)
         
         # Update the current data source immediately
         self.data_source = data_source
@@ -1334,127 +3905,10 @@ class GlucoseWidget:
         self.login_window_created = False
         logging.info("Login window closed")
         
-        # Trigger immediate update
-        self.root.after(100, self.update_labels)
-
-    def update_prediction_history(self, timestamp, glucose):
-        """Maintain a history of recent glucose readings for prediction"""
-        # Convert glucose to mg/dL for consistent storage
-        if self.unit == "mmol":
-            store_glucose = glucose * 18.0  # Convert to mg/dL
-        else:
-            store_glucose = glucose
-        
-        # Filter out old readings (keep only last 60 minutes)
-        cutoff = datetime.datetime.now() - datetime.timedelta(minutes=60)
-        self.prediction_history = [
-            (t, g) for t, g in self.prediction_history 
-            if t >= cutoff
-        ]
-        
-        # Add new reading if not duplicate
-        if not self.prediction_history or timestamp != self.prediction_history[-1][0]:
-            self.prediction_history.append((timestamp, store_glucose))
-            logging.info(f"Added to history: {timestamp} - {store_glucose:.1f} mg/dL")
-        
-        # Save history after each update
-        self.save_history()
-
-    def predict_glucose(self):
-        """Predict glucose 15 minutes ahead using time-aware linear regression"""
-        if len(self.prediction_history) < 3:
-            logging.info("Prediction skipped: Not enough history data")
-            return None, None, None, None
-
-        try:
-            # Create a segment of consecutive readings without large gaps
-            segment = []
-            sorted_history = sorted(self.prediction_history, key=lambda x: x[0])
-            
-            # Start from most recent reading and go backward
-            segment.append(sorted_history[-1])
-            for i in range(len(sorted_history)-2, -1, -1):
-                time_gap = (segment[0][0] - sorted_history[i][0]).total_seconds() / 60
-                if time_gap > 15:  # Found a gap larger than 15 minutes
-                    break
-                segment.insert(0, sorted_history[i])  # Add to beginning
-                
-            if len(segment) < 3:
-                logging.info(f"Prediction skipped: Only {len(segment)} consecutive readings")
-                return None, None, None, None
-                
-            timestamps, glucose_vals = zip(*segment)
-            
-            # Log segment being used
-            segment_str = ", ".join(
-                f"{t.strftime('%H:%M')}:{g:.1f}mg/dL" 
-                for t, g in segment
-            )
-            logging.info(f"Using consecutive segment: {segment_str}")
-            
-            # Calculate time differences in minutes from most recent reading
-            base_time = timestamps[-1]  # Most recent reading
-            time_deltas = [(t - base_time).total_seconds() / 60 for t in timestamps]
-            
-            # Prepare data for regression
-            X = np.array(time_deltas).reshape(-1, 1)
-            y = np.array(glucose_vals)
-            
-            # Fit linear regression model
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Predict 15 minutes from last reading
-            prediction_mgdl = model.predict([[15]])[0]
-            
-            # Calculate trend and confidence
-            last_glucose = glucose_vals[-1]
-            delta_mgdl = prediction_mgdl - last_glucose
-            slope = model.coef_[0]  # mg/dL per minute
-            
-            # Convert slope to mmol/min for consistent trend thresholds
-            slope_mmol = slope / 18.0
-            
-            # Determine trend arrow
-            if slope_mmol > 0.03: trend = "↑↑"
-            elif slope_mmol > 0.01: trend = "↑"
-            elif slope_mmol < -0.03: trend = "↓↓"
-            elif slope_mmol < -0.01: trend = "↓"
-            else: trend = "→"
-            
-            # Calculate confidence (R² + time span factor)
-            r2 = max(0, model.score(X, y))
-            time_span = (timestamps[-1] - timestamps[0]).total_seconds() / 60
-            confidence = int((r2 * 0.7 + min(1, time_span/30) * 0.3) * 100)
-            
-            # Convert to display unit
-            if self.unit == "mmol":
-                prediction = prediction_mgdl / 18.0
-                delta = delta_mgdl / 18.0
-            else:
-                prediction = prediction_mgdl
-                delta = delta_mgdl
-            
-            # Validate prediction sanity
-            reasonable_min = 2.0 if self.unit == "mmol" else 36.0
-            reasonable_max = 25.0 if self.unit == "mmol" else 450.0
-            
-            if prediction < reasonable_min or prediction > reasonable_max:
-                logging.warning(
-                    f"Discarding implausible prediction: {prediction:.1f} "
-                    f"(min={reasonable_min}, max={reasonable_max})"
-                )
-                return None, None, None, None
-            
-            logging.info(
-                f"Prediction: {last_glucose/18.0 if self.unit == 'mmol' else last_glucose:.1f} → "
-                f"{prediction:.1f} ({trend}), confidence: {confidence}%"
-            )
-            return prediction, delta, trend, confidence
-
-        except Exception as e:
-            logging.error(f"Prediction failed: {e}", exc_info=True)
-            return None, None, None, None
+        # Restart the single poll loop for the new source
+        self.poll_scheduler.reset()
+        self.request_backfill()
+        self.poll_now()
 
     def show_login_window(self):
         """Create and display the login window."""
@@ -1611,57 +4065,6 @@ class GlucoseWidget:
                  command=dialog.destroy,
                  width=15).pack(side="left", padx=10)
 
-    @staticmethod
-    def set_file_permissions(file_path):
-        """Set secure file permissions for sensitive files."""
-        try:
-            if platform.system() == "Windows":
-                # Remove all access except owner
-                os.chmod(file_path, stat.S_IREAD | stat.S_IWRITE)
-                # Mark as hidden
-                ctypes.windll.kernel32.SetFileAttributesW(file_path, 2)
-            else:
-                # Unix: Restrict to owner only
-                os.chmod(file_path, stat.S_IRUSR | stat.S_IWUSR)
-        except Exception as e:
-            logging.error(f"Permission setting failed: {e}")
-
-    def set_file_permissions(self, path):
-        """Set secure file permissions with Windows-specific fixes."""
-        try:
-            if not os.path.exists(path):
-                return
-                
-            if platform.system() == "Windows":
-                try:
-                    # Reset read-only attribute if set
-                    ctypes.windll.kernel32.SetFileAttributesW(path, 128)  # FILE_ATTRIBUTE_NORMAL
-                    
-                    # Grant full control to current user
-                    import win32security
-                    import ntsecuritycon
-                    
-                    user, _, _ = win32security.LookupAccountName("", os.getlogin())
-                    sd = win32security.GetFileSecurity(path, win32security.DACL_SECURITY_INFORMATION)
-                    
-                    dacl = win32security.ACL()
-                    dacl.AddAccessAllowedAce(
-                        win32security.ACL_REVISION,
-                        ntsecuritycon.FILE_ALL_ACCESS,
-                        user
-                    )
-                    
-                    sd.SetSecurityDescriptorDacl(1, dacl, 0)
-                    win32security.SetFileSecurity(path, win32security.DACL_SECURITY_INFORMATION, sd)
-                except Exception:
-                    # Fallback to basic permission set
-                    os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
-            else:
-                # Unix: Restrict to owner only
-                os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
-        except Exception as e:
-            logging.error(f"Permission setting failed for {path}: {e}")
-
     def verify_file_creation(self, path):
         """Verify if a file was successfully created and log results."""
         try:
@@ -1709,52 +4112,6 @@ class GlucoseWidget:
             except IOError as e:
                 logging.warning(f"File {os.path.basename(file_path)} is LOCKED: {e}")
 
-    def safe_write_json(self, file_path, data, retries=3):
-        """Safely write JSON data with Windows permission fixes."""
-        for attempt in range(retries):
-            try:
-                # Create directory if needed
-                dir_path = os.path.dirname(file_path)
-                if dir_path and not os.path.exists(dir_path):
-                    os.makedirs(dir_path, exist_ok=True)
-                    self.set_file_permissions(dir_path)
-            
-                # Write to temporary file first
-                temp_path = file_path + f'.tmp{random.randint(1000,9999)}'
-                with open(temp_path, 'w') as f:
-                    json.dump(data, f)
-                
-                # Ensure permissions before move
-                self.set_file_permissions(temp_path)
-                
-                # Atomic replace
-                if os.path.exists(file_path):
-                    self.set_file_permissions(file_path)  # Ensure target is writable
-                os.replace(temp_path, file_path)
-                
-                # Final permission set
-                self.set_file_permissions(file_path)
-                return True
-            except PermissionError as pe:
-                logging.warning(f"Attempt {attempt+1} permission error: {pe}")
-                time.sleep(0.5 * (attempt + 1))
-            except Exception as e:
-                logging.error(f"Write error: {e}")
-                break
-    
-        # Fallback to user's temp directory
-        try:
-            temp_dir = tempfile.gettempdir()
-            fallback_path = os.path.join(temp_dir, os.path.basename(file_path))
-            
-            with open(fallback_path, 'w') as f:
-                json.dump(data, f)
-            
-            logging.warning(f"Used fallback location: {fallback_path}")
-            return True
-        except Exception as e:
-            logging.critical(f"Fallback write failed: {e}")
-            return False
     def save_last_position(self):
         """Save the last window position to the settings file."""
         try:
@@ -1765,12 +4122,8 @@ class GlucoseWidget:
                 "is_pinned": self.is_pinned
             }
             
-            # Load existing settings or create a new dictionary
-            settings = self.load_settings() or {}
-            settings["last_position"] = position
-            
-            # Save settings to file
-            self.safe_write_json(self.settings_file_path, settings)
+            # Update the in-memory settings; written on the next flush
+            self.settings.update(last_position=position)
             logging.info("Window position saved successfully")
         except Exception as e:
             logging.error(f"Error saving window position: {e}")
@@ -1779,12 +4132,11 @@ class GlucoseWidget:
         """Load the last saved window position with fallbacks."""
         try:
             # Try to load position from settings
-            settings = self.load_settings()
-            if settings and "last_position" in settings:
-                pos = settings["last_position"]
+            pos = self.settings.last_position
+            if pos:
                 if isinstance(pos, dict) and "x" in pos and "y" in pos:
                     self.root.geometry(f"+{pos['x']}+{pos['y']}")
-                    self.is_pinned = settings.get("is_pinned", False)
+                    self.is_pinned = self.settings.is_pinned
                     self.root.wm_attributes("-topmost", self.is_pinned)
                     return
             
@@ -1802,9 +4154,23 @@ class GlucoseWidget:
         except Exception as e:
             logging.error(f"Error during close: {e}")
         finally:
+            self.poll_controller.stop()
+            self.acquisition.stop()
+            self.save_history()
+            self.persistence.flush()
+            self.local_api_enabled = False
+            self.update_local_api()
             # Ensure the window closes regardless of errors
             self.root.destroy()
 
+    def flush_persistence(self):
+        """Timed write-behind flush of settings, credentials and history."""
+        try:
+            self.persistence.flush()
+            self.vault.expire()
+        finally:
+            self.root.after(PersistenceManager.FLUSH_INTERVAL * 1000, self.flush_persistence)
+
     def snooze_notifications(self):
         """Snooze notifications for a specified duration."""
         try:
@@ -1953,63 +4319,144 @@ class GlucoseWidget:
 
     def migrate_credentials(self):
         """Move any plaintext credentials to encrypted storage."""
-        config = self.load_config()
-        if not config:
-            return
-
+        legacy = self.settings.extra
         migrated = False
         
         # Migrate Dexcom credentials
-        if "dexcom_credentials" in config:
-            creds = config["dexcom_credentials"]
-            if "username" in creds and "password" in creds:
-                self.save_credentials("Dexcom", creds)
-                del config["dexcom_credentials"]
-                migrated = True
+        creds = legacy.get("dexcom_credentials")
+        if creds and "username" in creds and "password" in creds:
+            self.save_credentials("Dexcom", creds)
+            self.settings.pop_extra("dexcom_credentials")
+            migrated = True
         
         # Migrate Nightscout credentials
-        if "nightscout_credentials" in config:
-            creds = config["nightscout_credentials"]
-            if "url" in creds:
-                self.save_credentials("Nightscout", creds)
-                del config["nightscout_credentials"]
-                migrated = True
+        creds = legacy.get("nightscout_credentials")
+        if creds and "url" in creds:
+            self.save_credentials("Nightscout", creds)
+            self.settings.pop_extra("nightscout_credentials")
+            migrated = True
                 
         if migrated:
-            self.save_config(config)
             logging.info("Migrated plaintext credentials to encrypted storage")
 
-    def load_encrypted_credentials(self):
-        """Load encrypted credentials from the credentials file."""
-        try:
-            if not os.path.exists(self.credentials_file_path):
-                logging.warning("Credentials file does not exist")
-                return None
-            
-            with open(self.credentials_file_path, 'rb') as file:
-                encrypted_credentials = file.read()
-            
-            if not encrypted_credentials:
-                logging.warning("Credentials file is empty")
-                return None
-            
-            return encrypted_credentials
-        except Exception as e:
-            logging.error(f"Failed to load encrypted credentials: {e}")
-           
-
-           
-            return None
-
     @staticmethod
     def get_current_platform():
         """Return the current platform as a string."""
         import platform
         return platform.system().lower()
 
+def run_replay_benchmark(trace_path, speed=0):
+    """Replay a trace through the headless reading pipeline and report throughput and latency.
+
+    Each reading goes through HeadlessMonitor.process_reading (archive,
+    alerts, update_prediction_history and predict_glucose) exactly as live
+    data would, without Tk, a display or the network. The pipeline clock
+    follows the trace and notifications are built but not sent. Every file is
+    written to a scratch data directory that is removed afterwards.
+    """
+    driver = ReplayDriver(trace_path, speed)
+    replay_dir = tempfile.mkdtemp(prefix="DexMate_replay_")
+    monitor = HeadlessMonitor(data_dir=replay_dir)
+    monitor.send_notifications = False
+    monitor.set_driver(driver)
+    # Traces are replayed as they are; a gap must not turn into a catch-up fetch mid-run
+    monitor.gap_threshold = float("inf")
+
+    stats = PipelineStats()
+    for stage in ("update_prediction_history", "predict_glucose", "trigger_notification"):
+        setattr(monitor, stage, stats.wrap(stage, getattr(monitor, stage)))
+    process_reading = stats.wrap("process_reading (end-to-end)", monitor.process_reading)
+
+    count = 0
+    try:
+        start = time.perf_counter()
+        while not driver.exhausted:
+            reading = driver.fetch_latest()
+            monitor.clock = lambda t=reading.datetime: t
+            process_reading(reading)
+            count += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        monitor.set_driver(None)
+        if monitor._history_journal is not None:
+            monitor._history_journal.close()
+        shutil.rmtree(replay_dir, ignore_errors=True)
+
+    report = stats.report(count, elapsed)
+    logging.info(report)
+    print(report)
+
+def run_write_benchmark(count=200):
+    """Time atomic writes of settings- and history-sized files in the data directory.
+
+    Runs in a scratch folder under the app support directory so fsync hits
+    the same disk as the real files, then removes it.
+    """
+    monitor = GlucoseMonitor()
+    bench_dir = tempfile.mkdtemp(prefix="write_bench_", dir=app_support_dir)
+    settings = {"unit": "mmol", "min_value": 3.9, "max_value": 10.0, "opacity": 0.8,
+                "last_position": {"x": 100, "y": 100, "is_pinned": False}}
+    now = datetime.datetime.now()
+    history = [((now - datetime.timedelta(minutes=5 * i)).isoformat(), 100.0 + i) for i in range(12)]
+    path = os.path.join(bench_dir, "settings.json")
+
+    stats = PipelineStats()
+    write_settings = stats.wrap("safe_write_json settings", monitor.safe_write_json)
+    write_history = stats.wrap("safe_write_json history", monitor.safe_write_json)
+    write_raw = stats.wrap("atomic_write (no dir sync)", atomic_write)
+    secure = stats.wrap("set_file_permissions", monitor.set_file_permissions)
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            write_settings(path, settings)
+            write_history(os.path.join(bench_dir, "history.json"), history)
+            write_raw(os.path.join(bench_dir, "raw.json"), json.dumps(settings).encode(), sync_directory=False)
+            secure(path)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+
+    report = f"{count * 3} writes in {elapsed:.2f}s ({count * 3 / elapsed if elapsed else 0:.1f} writes/s)\n{stats.table()}"
+    logging.info(report)
+    print(report)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DexMate glucose widget")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="Replay a JSON/CSV glucose trace through the pipeline and report timings")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Replay speed multiplier (0 = as fast as possible)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run the fetch/predict/alert pipeline without a window (also DEXMATE_HEADLESS=1)")
+    parser.add_argument("--api-port", type=int, metavar="PORT",
+                        help="Serve readings on a localhost Nightscout-compatible API on this port")
+    parser.add_argument("--bench-writes", type=int, metavar="COUNT",
+                        help="Time COUNT rounds of atomic settings/history writes and report the per-write cost")
+    args = parser.parse_args()
+
+    if args.bench_writes:
+        run_write_benchmark(args.bench_writes)
+        sys.exit(0)
+
+    # A replay never starts the live monitor, even with --headless or DEXMATE_HEADLESS=1
+    if args.replay:
+        run_replay_benchmark(args.replay, args.speed)
+        sys.exit(0)
+
+    if HEADLESS:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        monitor = HeadlessMonitor()
+        if args.api_port:
+            monitor.local_api_enabled = True
+            monitor.local_api_port = args.api_port
+        sys.exit(monitor.run())
+
     root = tk.Tk()
     app = GlucoseWidget(root)
+    if args.api_port:
+        app.local_api_enabled = True
+        app.local_api_port = args.api_port
+        app.update_local_api()
     
     # Set icon for main window using our new method
     app.set_window_icon(root)
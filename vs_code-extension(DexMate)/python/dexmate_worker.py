@@ -0,0 +1,102 @@
+"""Long-lived Dexcom worker for the DexMate VS Code extension.
+
+Started once by the extension and kept running. It speaks newline-delimited
+JSON over stdin/stdout, one request per line:
+
+    {"id": 1, "method": "configure", "params": {"username": ..., "password": ..., "region": "ous"}}
+    {"id": 2, "method": "readings", "params": {"minutes": 180}}
+
+and answers each with {"id": ..., "result": ...} or {"id": ..., "error": "..."}.
+The Dexcom session is kept between requests. The extension keeps its own
+reading buffer and only asks for the minutes since its newest reading.
+"""
+
+import sys
+import json
+
+from pydexcom import Dexcom
+try:
+    from pydexcom.errors import SessionError
+except ImportError:  # Older pydexcom releases have no errors module
+    class SessionError(Exception):
+        pass
+
+
+class Worker:
+    READING_INTERVAL = 5  # Minutes between CGM readings
+
+    def __init__(self):
+        self.credentials = None
+        self.dexcom = None
+
+    def login(self):
+        username, password, region = self.credentials
+        self.dexcom = Dexcom(username=username, password=password, region=region)
+
+    def configure(self, username, password, region="ous"):
+        """Log in with new credentials."""
+        self.credentials = (username, password, region)
+        self.login()
+        return {"ok": True}
+
+    def call(self, func, *args, **kwargs):
+        """Call a Dexcom method, logging in again once if the session expired."""
+        if self.dexcom is None:
+            if self.credentials is None:
+                raise RuntimeError("Worker is not configured")
+            self.login()
+        try:
+            return func(self.dexcom, *args, **kwargs)
+        except SessionError:
+            self.login()
+            return func(self.dexcom, *args, **kwargs)
+
+    @staticmethod
+    def to_dict(reading):
+        return {
+            "value": reading.value / 18.0,
+            "trend": str(reading.trend_direction),
+            "time": reading.datetime.isoformat() if reading.datetime else None,
+        }
+
+    def get_readings(self, minutes=180):
+        """Return the readings of the last minutes, newest first."""
+        minutes = max(self.READING_INTERVAL, min(int(minutes), 1440))
+        fetched = self.call(
+            lambda dexcom: dexcom.get_glucose_readings(
+                minutes=minutes, max_count=minutes // self.READING_INTERVAL + 1
+            )
+        ) or []
+        return {"historical": [self.to_dict(reading) for reading in fetched]}
+
+    def handle(self, request):
+        method = request.get("method")
+        params = request.get("params") or {}
+        if method == "configure":
+            return self.configure(**params)
+        if method == "readings":
+            return self.get_readings(**params)
+        if method == "ping":
+            return {"ok": True}
+        raise ValueError(f"Unknown method: {method}")
+
+
+def main():
+    worker = Worker()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "result": worker.handle(request)}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
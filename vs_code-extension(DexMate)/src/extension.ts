@@ -1,5 +1,7 @@
 import * as vscode from 'vscode';
-import { spawn } from 'child_process';
+import * as path from 'path';
+import * as crypto from 'crypto';
+import { PythonWorker } from './pythonWorker';
 
 // Create a type for the exports
 export interface ExtensionExports {
@@ -7,9 +9,32 @@ export interface ExtensionExports {
 }
 
 let _statusBarItem: vscode.StatusBarItem;
-let updateInterval: NodeJS.Timeout;
+let updateTimer: NodeJS.Timeout | undefined;
 let lastValue: number | null = null;
 let lastNotificationTime: string | null = null;
+let worker: PythonWorker;
+let configuredCredentials: string | null = null;
+let updateInFlight = false;
+
+interface Reading {
+	value: number;  // mmol/L as sent by the worker
+	trend: string;
+	time: string;
+}
+
+// Recent readings, newest first; refreshes only fetch what is newer.
+// Persisted in globalState (not settings.json) and only when it changes.
+let readingBuffer: Reading[] = [];
+let bufferAccount: string | null = null;  // username@region the buffer belongs to
+let readingState: vscode.Memento;
+const READINGS_KEY = 'dexmate.readings';
+const HISTORY_MINUTES = 180;
+const READING_INTERVAL_MS = 5 * 60 * 1000;  // CGM cadence
+const UPLOAD_GRACE_MS = 15 * 1000;  // Share upload latency after a sensor reading
+const RETRY_DELAY_MS = 30 * 1000;  // Poll interval while a reading is late or a request failed
+const CONFIG_SETTLE_MS = 1000;  // The configure command writes username, password and region one by one
+const WARNING_INTERVAL_MS = 30 * 60 * 1000;  // Repeat a failure toast at most this often during an outage
+let lastWarningTime = 0;  // Date.now() of the last failure toast, 0 after a successful refresh
 
 export function activate(context: vscode.ExtensionContext) {
 	// Create status bar item
@@ -19,6 +44,20 @@ export function activate(context: vscode.ExtensionContext) {
 	);
 	context.subscriptions.push(_statusBarItem);
 
+	// Restore the reading buffer from the last session
+	readingState = context.globalState;
+	const stored = readingState.get<{ account: string, readings: Reading[] }>(READINGS_KEY);
+	if (stored) {
+		bufferAccount = stored.account;
+		readingBuffer = stored.readings;
+	}
+	clearLegacyReadingSetting();
+
+	// One persistent python process keeps the Dexcom session between refreshes
+	worker = new PythonWorker(context.asAbsolutePath(path.join('python', 'dexmate_worker.py')));
+	worker.start();
+	context.subscriptions.push(worker);
+
 	// Create command to update glucose
 	let disposable = vscode.commands.registerCommand('dexmate.updateGlucose', () => {
 		updateGlucoseData();
@@ -84,11 +123,16 @@ export function activate(context: vscode.ExtensionContext) {
 	});
 	context.subscriptions.push(configureCommand);
 
-	// Initial update
+	// Initial update; later updates are scheduled from the reading cadence
 	updateGlucoseData();
 
-	// Update every 5 seconds (5000 milliseconds) instead of every second
-	updateInterval = setInterval(updateGlucoseData, 5000);
+	// New credentials restart the loop, which stops while they are missing;
+	// updateGlucoseData logs the worker in again when they differ
+	context.subscriptions.push(vscode.workspace.onDidChangeConfiguration((event) => {
+		if (['dexmate.username', 'dexmate.password', 'dexmate.region'].some((key) => event.affectsConfiguration(key))) {
+			scheduleNextUpdate(CONFIG_SETTLE_MS);
+		}
+	}));
 
 	_statusBarItem.command = 'dexmate.showMenu';
 
@@ -142,7 +186,7 @@ export function activate(context: vscode.ExtensionContext) {
 	} as ExtensionExports;
 }
 
-function updateGlucoseData() {
+async function updateGlucoseData() {
 	const config = vscode.workspace.getConfiguration('dexmate');
 	const username = config.get<string>('username');
 	const password = config.get<string>('password');
@@ -165,143 +209,183 @@ function updateGlucoseData() {
 		return;
 	}
 
-	console.log('Starting Python process...');
-	const pythonScript = `
-import sys
-import json
-from pydexcom import Dexcom
-from datetime import datetime, timedelta
-
-try:
-    region = "${region}"
-    dexcom = Dexcom(username="${username}", password="${password}", region=region)
-    
-    # Calculate minutes for the last 3 hours (3 * 60 = 180 minutes)
-    minutes = 180
-    
-    # Get readings for the last 3 hours
-    historical_readings = dexcom.get_glucose_readings(minutes)
-    
-    # Format all readings
-    readings = []
-    for reading in historical_readings:
-        readings.append({
-            "value": reading._value / 18.0,
-            "trend": str(reading._trend_direction),
-            "time": reading._datetime.isoformat() if reading._datetime else None
-        })
-    
-    print(json.dumps({"historical": readings}))
-
-except Exception as e:
-    print(f"Error: {str(e)}", file=sys.stderr)
-    sys.exit(1)
-`;
-
-	const pythonProcess = spawn('python', ['-c', pythonScript]);
-	let output = '';
-	let errorOutput = '';
-
-	pythonProcess.stdout.on('data', (data) => {
-		console.log('Stdout:', data.toString());
-		output += data.toString();
-	});
+	// Skip a tick while the previous request is still running
+	if (updateInFlight) {
+		return;
+	}
+	updateInFlight = true;
+
+	let data: any;
+	try {
+		// Log in only when the credentials change, the worker keeps the session
+		const credentials = JSON.stringify({ username, password, region });
+		if (credentials !== configuredCredentials) {
+			await worker.configure({ username, password, region });
+			configuredCredentials = credentials;
+			const account = `${username}@${region}`;
+			if (account !== bufferAccount) {
+				readingBuffer = [];
+				bufferAccount = account;
+			}
+		}
 
-	pythonProcess.stderr.on('data', (data) => {
-		console.log('Stderr:', data.toString());
-		errorOutput += data.toString();
-	});
+		data = await worker.request('readings', { minutes: minutesToFetch() });
+	} catch (e) {
+		scheduleNextUpdate(RETRY_DELAY_MS);
+		const errorOutput = e instanceof Error ? e.message : String(e);
+		let errorMessage = errorOutput;
+		if (errorOutput.includes('No reading available')) {
+			_statusBarItem.text = '$(warning) No recent readings';
+			errorMessage = 'No recent glucose readings available. Please check your Dexcom device.';
+		} else {
+			_statusBarItem.text = '$(error) Glucose data unavailable';
+		}
+		_statusBarItem.tooltip = errorMessage;
+		_statusBarItem.show();
+		// The status bar shows every failure, the toast only the first of an outage and then every 30 minutes
+		if (Date.now() - lastWarningTime >= WARNING_INTERVAL_MS) {
+			lastWarningTime = Date.now();
+			vscode.window.showWarningMessage(errorMessage);
+		}
+		return;
+	} finally {
+		updateInFlight = false;
+	}
 
-	pythonProcess.on('close', async (code) => {
-		console.log(`Process exited with code ${code}`);
-		console.log('Output:', output);
-		console.log('Errors:', errorOutput);
+	lastWarningTime = 0;
+	const fresh = mergeReadings(data.historical);
+	const added = fresh.length;
+	GlucoseGraphPanel.addReadings(fresh);
+	scheduleNextUpdate(nextUpdateDelay());
 
-		if (code === 0 && output.trim()) {
-			try {
-				const data = JSON.parse(output.trim());
-				console.log('Parsed reading:', data);
-				
-				// Convert values based on unit setting before storing
-				const config = vscode.workspace.getConfiguration('dexmate');
-				const unit = config.get<string>('unit') || 'mmol';
-				
-				const convertedReadings = data.historical.map((reading: any) => ({
-					...reading,
-					value: unit === 'mmol' 
-						? Number(reading.value.toFixed(1))
-						: Math.round(reading.value * 18.0)
-				}));
-
-				// Store the converted readings
-				await config.update('lastReadings', convertedReadings, true);
-
-				// Get the most recent reading from historical data
-				const latestReading = data.historical[0];
-				if (!latestReading) {
-					throw new Error('No readings available');
-				}
+	try {
+		console.log(`Fetched ${data.historical.length} readings, ${added} new`);
+		
+		// Convert values based on unit setting before storing
+		const config = vscode.workspace.getConfiguration('dexmate');
+		const unit = config.get<string>('unit') || 'mmol';
+		
+		if (added > 0) {
+			// Persist the buffer outside settings.json, only when it changed
+			await readingState.update(READINGS_KEY, { account: bufferAccount, readings: readingBuffer });
+		}
 
-				const currentValue = unit === 'mmol' 
-					? parseFloat(latestReading.value)
-					: Math.round(parseFloat(latestReading.value) * 18.0);
-				const currentTime = latestReading.time;
+		// Get the most recent reading from the buffer
+		const latestReading = readingBuffer[0];
+		if (!latestReading) {
+			throw new Error('No readings available');
+		}
 
-				// Update status bar with color
-				const displayValue = unit === 'mmol' 
-					? currentValue.toFixed(1) 
-					: Math.round(currentValue).toString();
-				
-				_statusBarItem.text = `$(pulse) ${displayValue} ${unit === 'mmol' ? 'mmol/L' : 'mg/dL'} ${getTrendArrow(latestReading.trend)}`;
-				_statusBarItem.tooltip = `Last reading: ${new Date(currentTime).toLocaleTimeString()}`;
-				_statusBarItem.color = new vscode.ThemeColor(getGlucoseColor(currentValue));
-				_statusBarItem.show();
-
-				// Handle notifications
-				if (shouldNotify(currentValue, currentTime)) {
-					const unit = config.get<string>('unit') || 'mmol';
-					const displayValue = unit === 'mmol' 
-						? currentValue.toFixed(1) 
-						: Math.round(currentValue).toString();
-					
-					let message = `Glucose: ${displayValue} ${unit === 'mmol' ? 'mmol/L' : 'mg/dL'} ${getTrendArrow(latestReading.trend)}`;
-					
-					const targetHigh = config.get<number>('targetHigh') || (unit === 'mmol' ? 10.0 : 180);
-					const targetLow = config.get<number>('targetLow') || (unit === 'mmol' ? 4.0 : 72);
-					
-					if (currentValue > targetHigh) {
-						message += ' (High)';
-						vscode.window.showWarningMessage(message);
-					} else if (currentValue < targetLow) {
-						message += ' (Low)';
-						vscode.window.showWarningMessage(message);
-					} else if (lastValue && Math.abs(currentValue - lastValue) >= (unit === 'mmol' ? 2.0 : 36)) {
-						message += ' (Rapid Change)';
-						vscode.window.showWarningMessage(message);
-					}
+		const currentValue = unit === 'mmol' 
+			? latestReading.value
+			: Math.round(latestReading.value * 18.0);
+		const currentTime = latestReading.time;
 
-					lastNotificationTime = currentTime;
-				}
-				lastValue = currentValue;
-			} catch (e) {
-				console.error('Failed to parse glucose data:', e);
-				_statusBarItem.text = '$(error) Parse error';
-				_statusBarItem.color = new vscode.ThemeColor('errorForeground');
-				_statusBarItem.show();
-			}
-		} else {
-			let errorMessage = errorOutput;
-			if (errorOutput.includes('No reading available')) {
-				_statusBarItem.text = '$(warning) No recent readings';
-				errorMessage = 'No recent glucose readings available. Please check your Dexcom device.';
-			} else {
-				_statusBarItem.text = '$(error) Glucose data unavailable';
+		// Update status bar with color
+		const displayValue = unit === 'mmol' 
+			? currentValue.toFixed(1) 
+			: Math.round(currentValue).toString();
+		
+		_statusBarItem.text = `$(pulse) ${displayValue} ${unit === 'mmol' ? 'mmol/L' : 'mg/dL'} ${getTrendArrow(latestReading.trend)}`;
+		_statusBarItem.tooltip = `Last reading: ${new Date(currentTime).toLocaleTimeString()}`;
+		_statusBarItem.color = new vscode.ThemeColor(getGlucoseColor(currentValue));
+		_statusBarItem.show();
+
+		// Handle notifications
+		if (shouldNotify(currentValue, currentTime)) {
+			const unit = config.get<string>('unit') || 'mmol';
+			const displayValue = unit === 'mmol' 
+				? currentValue.toFixed(1) 
+				: Math.round(currentValue).toString();
+			
+			let message = `Glucose: ${displayValue} ${unit === 'mmol' ? 'mmol/L' : 'mg/dL'} ${getTrendArrow(latestReading.trend)}`;
+			
+			const targetHigh = config.get<number>('targetHigh') || (unit === 'mmol' ? 10.0 : 180);
+			const targetLow = config.get<number>('targetLow') || (unit === 'mmol' ? 4.0 : 72);
+			
+			if (currentValue > targetHigh) {
+				message += ' (High)';
+				vscode.window.showWarningMessage(message);
+			} else if (currentValue < targetLow) {
+				message += ' (Low)';
+				vscode.window.showWarningMessage(message);
+			} else if (lastValue && Math.abs(currentValue - lastValue) >= (unit === 'mmol' ? 2.0 : 36)) {
+				message += ' (Rapid Change)';
+				vscode.window.showWarningMessage(message);
 			}
-			_statusBarItem.tooltip = errorMessage;
-			_statusBarItem.show();
-			vscode.window.showWarningMessage(errorMessage);
+
+			lastNotificationTime = currentTime;
 		}
-	});
+		lastValue = currentValue;
+	} catch (e) {
+		console.error('Failed to process glucose data:', e);
+		_statusBarItem.text = '$(error) Parse error';
+		_statusBarItem.color = new vscode.ThemeColor('errorForeground');
+		_statusBarItem.show();
+	}
+}
+
+/** Minutes of history to request: everything since the newest buffered reading. */
+function minutesToFetch(): number {
+	const newest = readingBuffer[0];
+	if (!newest) {
+		return HISTORY_MINUTES;
+	}
+	const since = (Date.now() - new Date(newest.time).getTime()) / 60000;
+	return Math.max(5, Math.min(HISTORY_MINUTES, Math.ceil(since) + 5));
+}
+
+/** Merge fetched readings into the buffer and return the ones that were new. */
+function mergeReadings(fetched: Reading[]): Reading[] {
+	const known = new Set(readingBuffer.map((reading) => reading.time));
+	const fresh = fetched.filter((reading) => reading.time && !known.has(reading.time));
+	if (fresh.length === 0) {
+		return fresh;
+	}
+
+	const byTime = (reading: Reading) => new Date(reading.time).getTime();
+	readingBuffer = [...fresh, ...readingBuffer].sort((a, b) => byTime(b) - byTime(a));
+	const cutoff = byTime(readingBuffer[0]) - HISTORY_MINUTES * 60000;
+	readingBuffer = readingBuffer.filter((reading) => byTime(reading) >= cutoff);
+	return fresh;
+}
+
+/** Milliseconds until the next reading should be available on Dexcom Share. */
+function nextUpdateDelay(): number {
+	const newest = readingBuffer[0];
+	if (!newest) {
+		return RETRY_DELAY_MS;
+	}
+	const due = new Date(newest.time).getTime() + READING_INTERVAL_MS + UPLOAD_GRACE_MS;
+	const delay = due - Date.now();
+	// Once the reading is late, check again every RETRY_DELAY_MS
+	return delay > 0 ? delay : RETRY_DELAY_MS;
+}
+
+/** Buffered readings converted to the configured unit, newest first. */
+function readingsInUnit(unit: string): Reading[] {
+	return readingBuffer.map((reading) => ({
+		...reading,
+		value: unit === 'mmol'
+			? Number(reading.value.toFixed(1))
+			: Math.round(reading.value * 18.0)
+	}));
+}
+
+/** Remove the reading array older versions kept in the user's settings.json. */
+function clearLegacyReadingSetting() {
+	const config = vscode.workspace.getConfiguration('dexmate');
+	const legacy = config.inspect<unknown[]>('lastReadings')?.globalValue;
+	if (legacy !== undefined) {
+		void config.update('lastReadings', undefined, true);
+	}
+}
+
+function scheduleNextUpdate(delay: number) {
+	if (updateTimer) {
+		clearTimeout(updateTimer);
+	}
+	updateTimer = setTimeout(updateGlucoseData, delay);
 }
 
 function getTrendArrow(trend: string | undefined): string {
@@ -393,8 +477,8 @@ function toggleNotifications() {
 
 async function showLastHourReadings() {
 	const config = vscode.workspace.getConfiguration('dexmate');
-	const readings = config.get<Array<{value: number, time: string}>>('lastReadings') || [];
 	const unit = config.get<string>('unit') || 'mmol';
+	const readings = readingsInUnit(unit);
 	
 	const lastHourReadings = readings
 		.filter(reading => new Date(reading.time).getTime() > Date.now() - 3600000)
@@ -415,57 +499,120 @@ async function showLastHourReadings() {
 
 // This method is called when your extension is deactivated
 export function deactivate() {
-	if (updateInterval) {
-			clearInterval(updateInterval);
+	if (updateTimer) {
+			clearTimeout(updateTimer);
 	}
 }
 
 class GlucoseGraphPanel {
+	private static currentPanel: GlucoseGraphPanel | undefined;
+	private lastTime = 0;  // Newest point sent to the webview, epoch ms
+	private ready = false;
+	private readonly disposables: vscode.Disposable[] = [];
+
 	public static async createOrShow(context: vscode.ExtensionContext) {
+		// Reuse the live panel instead of rebuilding the page
+		if (GlucoseGraphPanel.currentPanel) {
+			GlucoseGraphPanel.currentPanel.panel.reveal(vscode.ViewColumn.One);
+			return;
+		}
+
+		const chartDir = vscode.Uri.joinPath(context.extensionUri, 'node_modules', 'chart.js', 'dist');
 		const panel = vscode.window.createWebviewPanel(
 			'glucoseGraph',
 			'Glucose Readings',
 			vscode.ViewColumn.One,
-			{ enableScripts: true }
+			{
+				enableScripts: true,
+				retainContextWhenHidden: true,
+				localResourceRoots: [chartDir]
+			}
 		);
 
+		const chartUri = panel.webview.asWebviewUri(vscode.Uri.joinPath(chartDir, 'chart.umd.js'));
+		panel.webview.html = getWebviewContent(panel.webview, chartUri);
+		GlucoseGraphPanel.currentPanel = new GlucoseGraphPanel(panel);
+	}
+
+	/** Send newly merged readings (newest first) to an open graph. */
+	public static addReadings(fresh: Reading[]) {
+		GlucoseGraphPanel.currentPanel?.append(fresh);
+	}
+
+	private constructor(private readonly panel: vscode.WebviewPanel) {
+		panel.onDidDispose(() => this.dispose(), null, this.disposables);
+		panel.webview.onDidReceiveMessage((message) => {
+			if (message.type === 'ready') {
+				this.ready = true;
+				this.postInit();
+			}
+		}, null, this.disposables);
+		vscode.workspace.onDidChangeConfiguration((event) => {
+			if (event.affectsConfiguration('dexmate')) {
+				this.postInit();
+			}
+		}, null, this.disposables);
+	}
+
+	/** Send the full buffer, target range and unit. */
+	private postInit() {
+		if (!this.ready) {
+			return;
+		}
 		const config = vscode.workspace.getConfiguration('dexmate');
-		const readings = config.get<Array<{
-			value: number,
-			trend: string,
-			time: string
-		}>>('lastReadings') || [];
-
-		// Use the stored readings which are already in the correct unit
-		panel.webview.html = getWebviewContent({ historical: readings });
+		const unit = config.get<string>('unit') || 'mmol';
+		const readings = readingsInUnit(unit).reverse();
+		this.lastTime = readings.length ? new Date(readings[readings.length - 1].time).getTime() : 0;
+		void this.panel.webview.postMessage({
+			type: 'init',
+			unit,
+			targetLow: config.get<number>('targetLow') || (unit === 'mmol' ? 4.0 : 72),
+			targetHigh: config.get<number>('targetHigh') || (unit === 'mmol' ? 10.0 : 180),
+			historyMinutes: HISTORY_MINUTES,
+			points: readings.map((reading) => ({ time: reading.time, value: reading.value }))
+		});
 	}
-}
 
-function getWebviewContent(data: any) {
-	const config = vscode.workspace.getConfiguration('dexmate');
-	const unit = config.get<string>('unit') || 'mmol';
-	const targetLow = config.get<number>('targetLow') || (unit === 'mmol' ? 4.0 : 72);
-	const targetHigh = config.get<number>('targetHigh') || (unit === 'mmol' ? 10.0 : 180);
+	private append(fresh: Reading[]) {
+		if (!this.ready) {
+			return;
+		}
+		// Readings older than the last point (e.g. a backfill) need a full redraw
+		const times = fresh.map((reading) => new Date(reading.time).getTime());
+		if (times.some((time) => time <= this.lastTime)) {
+			this.postInit();
+			return;
+		}
 
-	// Reverse the readings array to show oldest to newest
-	const readings = (data.historical || []).reverse();
-	const values = readings.map((r: any) => Number(r.value));
-	const labels = readings.map((r: any) => new Date(r.time).toLocaleTimeString());
+		const unit = vscode.workspace.getConfiguration('dexmate').get<string>('unit') || 'mmol';
+		const points = fresh
+			.map((reading) => ({
+				time: reading.time,
+				value: unit === 'mmol' ? Number(reading.value.toFixed(1)) : Math.round(reading.value * 18.0)
+			}))
+			.reverse();
+		this.lastTime = Math.max(this.lastTime, ...times);
+		void this.panel.webview.postMessage({ type: 'append', points });
+	}
 
-	// Calculate dynamic Y-axis range based on actual values
-	const maxGlucose = Math.max(...values);
-	const minGlucose = Math.min(...values);
-	const yAxisBuffer = unit === 'mmol' ? 4 : 72;
-	
-	const yMin = Math.max(0, Math.min(minGlucose - yAxisBuffer, targetLow - yAxisBuffer));
-	const yMax = Math.max(maxGlucose + yAxisBuffer, targetHigh + yAxisBuffer);
+	private dispose() {
+		GlucoseGraphPanel.currentPanel = undefined;
+		this.disposables.forEach((disposable) => disposable.dispose());
+	}
+}
+
+function getWebviewContent(webview: vscode.Webview, chartUri: vscode.Uri) {
+	const nonce = crypto.randomBytes(16).toString('base64');
 
+	// Static page: data arrives by postMessage, the chart is updated in place
 	return `
 		<!DOCTYPE html>
 		<html>
 			<head>
+				<meta http-equiv="Content-Security-Policy"
+					content="default-src 'none'; script-src ${webview.cspSource} 'nonce-${nonce}'; style-src 'unsafe-inline';">
 				<title>Glucose Graph</title>
-				<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+				<script nonce="${nonce}" src="${chartUri}"></script>
 				<style>
 					canvas {
 						max-height: 80vh;
@@ -476,16 +623,28 @@ function getWebviewContent(data: any) {
 			</head>
 			<body>
 				<canvas id="glucoseChart"></canvas>
-				<script>
-					const ctx = document.getElementById('glucoseChart');
-					new Chart(ctx, {
+				<script nonce="${nonce}">
+					const vscode = acquireVsCodeApi();
+					let settings = null;
+					let times = [];  // Epoch ms of each point, oldest first
+
+					const axisTitle = (text) => ({
+						display: true,
+						text,
+						font: {
+							size: 14,
+							weight: 'bold'
+						}
+					});
+
+					const chart = new Chart(document.getElementById('glucoseChart'), {
 						type: 'line',
 						data: {
-							labels: ${JSON.stringify(labels)},
+							labels: [],
 							datasets: [
 								{
 									label: 'Target Range',
-									data: Array(${labels.length}).fill(${targetHigh}),
+									data: [],
 									borderColor: 'rgba(255, 0, 0, 0.2)',
 									backgroundColor: 'rgba(255, 0, 0, 0.1)',
 									fill: '+1',
@@ -494,7 +653,7 @@ function getWebviewContent(data: any) {
 								},
 								{
 									label: 'Target Range',
-									data: Array(${labels.length}).fill(${targetLow}),
+									data: [],
 									borderColor: 'rgba(255, 0, 0, 0.2)',
 									backgroundColor: 'rgba(0, 255, 0, 0.1)',
 									fill: false,
@@ -502,8 +661,8 @@ function getWebviewContent(data: any) {
 									order: 1
 								},
 								{
-									label: 'Glucose (${unit === 'mmol' ? 'mmol/L' : 'mg/dL'})',
-									data: ${JSON.stringify(values)},
+									label: 'Glucose',
+									data: [],
 									borderColor: 'rgb(75, 192, 192)',
 									borderWidth: 3,  // Increased line thickness
 									tension: 0.1,
@@ -517,19 +676,11 @@ function getWebviewContent(data: any) {
 						options: {
 							responsive: true,
 							maintainAspectRatio: false,
+							animation: false,
 							scales: {
 								y: {
 									beginAtZero: false,
-									min: ${yMin},
-									max: ${yMax},
-									title: {
-										display: true,
-										text: '${unit === 'mmol' ? 'mmol/L' : 'mg/dL'}',
-										font: {
-											size: 14,
-											weight: 'bold'
-										}
-									},
+									title: axisTitle(''),
 									ticks: {
 										font: {
 											size: 12
@@ -537,14 +688,7 @@ function getWebviewContent(data: any) {
 									}
 								},
 								x: {
-									title: {
-										display: true,
-										text: 'Time',
-										font: {
-											size: 14,
-											weight: 'bold'
-										}
-									},
+									title: axisTitle('Time'),
 									ticks: {
 										font: {
 											size: 12
@@ -565,6 +709,50 @@ function getWebviewContent(data: any) {
 							}
 						}
 					});
+
+					function addPoints(points) {
+						const [high, low, glucose] = chart.data.datasets;
+						for (const point of points) {
+							times.push(new Date(point.time).getTime());
+							chart.data.labels.push(new Date(point.time).toLocaleTimeString());
+							high.data.push(settings.targetHigh);
+							low.data.push(settings.targetLow);
+							glucose.data.push(point.value);
+						}
+
+						// Drop points that fell out of the history window
+						const cutoff = times[times.length - 1] - settings.historyMinutes * 60000;
+						while (times.length && times[0] < cutoff) {
+							times.shift();
+							chart.data.labels.shift();
+							chart.data.datasets.forEach((dataset) => dataset.data.shift());
+						}
+
+						// Dynamic Y-axis range based on actual values
+						const values = glucose.data;
+						const buffer = settings.unit === 'mmol' ? 4 : 72;
+						chart.options.scales.y.min = Math.max(0, Math.min(Math.min(...values) - buffer, settings.targetLow - buffer));
+						chart.options.scales.y.max = Math.max(Math.max(...values) + buffer, settings.targetHigh + buffer);
+					}
+
+					window.addEventListener('message', (event) => {
+						const message = event.data;
+						if (message.type === 'init') {
+							settings = message;
+							times = [];
+							chart.data.labels = [];
+							chart.data.datasets.forEach((dataset) => { dataset.data = []; });
+							const unitLabel = message.unit === 'mmol' ? 'mmol/L' : 'mg/dL';
+							chart.data.datasets[2].label = 'Glucose (' + unitLabel + ')';
+							chart.options.scales.y.title.text = unitLabel;
+							addPoints(message.points);
+						} else if (message.type === 'append' && settings) {
+							addPoints(message.points);
+						}
+						chart.update('none');
+					});
+
+					vscode.postMessage({ type: 'ready' });
 				</script>
 			</body>
 		</html>
@@ -604,7 +792,11 @@ async function factoryReset() {
         await config.update('targetLow', 4.0, true);
         await config.update('targetHigh', 10.0, true);
         await config.update('notifications', true, true);
-        await config.update('lastReadings', [], true);
+        readingBuffer = [];
+        bufferAccount = null;
+        configuredCredentials = null;
+        worker.reset();  // Otherwise a worker restart would log in with the old credentials
+        await readingState.update(READINGS_KEY, undefined);
 
         vscode.window.showInformationMessage('All settings have been reset.');
         updateGlucoseData(); // This will trigger the configuration missing notification
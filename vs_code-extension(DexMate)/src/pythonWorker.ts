@@ -0,0 +1,173 @@
+import * as vscode from 'vscode';
+import * as readline from 'readline';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+
+interface PendingRequest {
+	resolve: (result: any) => void;
+	reject: (error: Error) => void;
+	timer: NodeJS.Timeout;
+}
+
+/**
+ * One long-lived python process running python/dexmate_worker.py.
+ *
+ * Requests and responses are newline-delimited JSON over stdin/stdout, so a
+ * refresh is a single in-process call on an already logged-in Dexcom
+ * session. If the process exits it is restarted with a growing delay and
+ * the last configuration is sent again before any queued request.
+ */
+export class PythonWorker implements vscode.Disposable {
+	private process: ChildProcessWithoutNullStreams | undefined;
+	private nextId = 1;
+	private pending = new Map<number, PendingRequest>();
+	private configureParams: object | undefined;
+	private restartDelay = PythonWorker.MIN_RESTART_DELAY;
+	private restartTimer: NodeJS.Timeout | undefined;
+	private disposed = false;
+
+	private static readonly MIN_RESTART_DELAY = 1000;
+	private static readonly MAX_RESTART_DELAY = 60000;
+	private static readonly REQUEST_TIMEOUT = 30000;
+
+	constructor(private readonly scriptPath: string, private readonly pythonCommand = 'python') {}
+
+	start() {
+		if (this.process || this.disposed) {
+			return;
+		}
+
+		console.log('Starting DexMate python worker...');
+		const child = spawn(this.pythonCommand, ['-u', this.scriptPath]);
+		this.process = child;
+
+		readline.createInterface({ input: child.stdout }).on('line', (line) => this.onLine(line));
+		child.stderr.on('data', (data) => console.log('Worker stderr:', data.toString()));
+		// Writes to a dead worker fail with EPIPE; the close handler restarts it
+		child.stdin.on('error', (error) => {
+			console.error('Python worker stdin error:', error);
+		});
+
+		// A failed spawn (e.g. ENOENT) emits 'error' and 'close' but never 'exit'
+		child.on('error', (error) => {
+			console.error('Python worker error:', error);
+			this.onWorkerGone(child, error.message);
+		});
+		child.on('close', (code) => {
+			this.onWorkerGone(child, `exited with code ${code}`);
+		});
+
+		if (this.configureParams) {
+			// A restarted worker has lost its Dexcom session
+			this.send('configure', this.configureParams).catch((error) => {
+				console.error('Failed to reconfigure python worker:', error);
+			});
+		}
+	}
+
+	/** Log in with new credentials; they are replayed after a restart. */
+	configure(params: object): Promise<any> {
+		this.configureParams = params;
+		return this.request('configure', params);
+	}
+
+	/** Forget the credentials and stop the process with its Dexcom session; the next request starts a fresh one. */
+	reset() {
+		this.configureParams = undefined;
+		if (this.restartTimer) {
+			clearTimeout(this.restartTimer);
+			this.restartTimer = undefined;
+		}
+		this.restartDelay = PythonWorker.MIN_RESTART_DELAY;
+		// Detached first so onWorkerGone does not schedule a restart
+		const child = this.process;
+		this.process = undefined;
+		this.rejectAll(new Error('Python worker reset'));
+		child?.kill();
+	}
+
+	request<T = any>(method: string, params: object = {}): Promise<T> {
+		this.start();
+		return this.send(method, params);
+	}
+
+	private send(method: string, params: object): Promise<any> {
+		const child = this.process;
+		if (!child) {
+			return Promise.reject(new Error('Python worker is not running'));
+		}
+
+		const id = this.nextId++;
+		return new Promise((resolve, reject) => {
+			const timer = setTimeout(() => {
+				this.pending.delete(id);
+				reject(new Error(`Python worker did not answer ${method} in time`));
+			}, PythonWorker.REQUEST_TIMEOUT);
+			this.pending.set(id, { resolve, reject, timer });
+			child.stdin.write(JSON.stringify({ id, method, params }) + '\n');
+		});
+	}
+
+	private onLine(line: string) {
+		let response: { id: number, result?: any, error?: string };
+		try {
+			response = JSON.parse(line);
+		} catch (e) {
+			console.log('Worker output:', line);
+			return;
+		}
+
+		const request = this.pending.get(response.id);
+		if (!request) {
+			return;
+		}
+		this.pending.delete(response.id);
+		clearTimeout(request.timer);
+		this.restartDelay = PythonWorker.MIN_RESTART_DELAY;
+
+		if (response.error !== undefined) {
+			request.reject(new Error(response.error));
+		} else {
+			request.resolve(response.result);
+		}
+	}
+
+	/** Tear down after the worker died or failed to start; safe to call more than once. */
+	private onWorkerGone(child: ChildProcessWithoutNullStreams, reason: string) {
+		if (this.process !== child) {
+			return;
+		}
+		console.log(`Python worker ${reason}`);
+		this.process = undefined;
+		this.rejectAll(new Error(`Python worker ${reason}`));
+		this.scheduleRestart();
+	}
+
+	private rejectAll(error: Error) {
+		for (const request of this.pending.values()) {
+			clearTimeout(request.timer);
+			request.reject(error);
+		}
+		this.pending.clear();
+	}
+
+	private scheduleRestart() {
+		if (this.disposed || this.restartTimer) {
+			return;
+		}
+		this.restartTimer = setTimeout(() => {
+			this.restartTimer = undefined;
+			this.start();
+		}, this.restartDelay);
+		this.restartDelay = Math.min(this.restartDelay * 2, PythonWorker.MAX_RESTART_DELAY);
+	}
+
+	dispose() {
+		this.disposed = true;
+		if (this.restartTimer) {
+			clearTimeout(this.restartTimer);
+		}
+		this.rejectAll(new Error('Python worker stopped'));
+		this.process?.kill();
+		this.process = undefined;
+	}
+}